@@ -1,18 +1,13 @@
 # graph_report.py
 # ------------------------------------------------------------
-from neo4j import GraphDatabase
-import os, textwrap, collections, re
-from dotenv import load_dotenv
+import os, sys, time, textwrap, collections, re, hashlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from graphdb.connection import close_connection, get_connection
 
 # ------------------------------------------------------------
-# Connessione
+# Connessione: pool condiviso (graphdb.connection), database da NEO4J_DB
 # ------------------------------------------------------------
-load_dotenv()
-driver = GraphDatabase.driver(
-    os.getenv("NEO4J_URI"),
-    auth=(os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD")),
-    database=os.getenv("NEO4J_DB", "neo4j"),
-)
 
 # ------------------------------------------------------------
 # Utility
@@ -22,6 +17,89 @@ def query_list(tx, cypher: str):
     return [r[0] for r in tx.run(cypher)]
 
 
+# ------------------------------------------------------------
+# Statistiche in un solo round trip (count store), con cache TTL
+# ------------------------------------------------------------
+STATS_TTL_S = float(os.getenv("REPORT_STATS_TTL_S", "60"))
+_stats_cache = {}  # database → (scadenza, statistiche)
+
+_CAMPIONE = """
+    CALL {
+      MATCH (e:Entity) WHERE e.name IS NOT NULL
+      WITH e.name AS n LIMIT 1000
+      RETURN collect(n) AS campione
+    }
+"""
+
+
+def _q(nome: str) -> str:
+    return "`" + nome.replace("`", "``") + "`"
+
+
+def _statistiche_apoc(session) -> dict:
+    """Un round trip: apoc.meta.stats legge i contatori del count store."""
+    rec = session.run(
+        "CALL apoc.meta.stats() YIELD nodeCount, relCount, labels, relTypesCount "
+        "WITH nodeCount, relCount, labels, relTypesCount"
+        + _CAMPIONE
+        + "RETURN nodeCount, relCount, labels, relTypesCount, campione"
+    ).single()
+    return {
+        "nodi": rec["nodeCount"],
+        "relazioni": rec["relCount"],
+        "etichette": dict(rec["labels"]),
+        "tipi": dict(rec["relTypesCount"]),
+        "campione": rec["campione"],
+    }
+
+
+def _statistiche_count_store(session) -> dict:
+    """Senza APOC: i nomi di etichette e tipi, poi un'unica query i cui
+    sottoquery con etichetta/tipo letterale sono risolte dal count store."""
+    meta = session.run(
+        "CALL db.labels() YIELD label WITH collect(label) AS etichette "
+        "CALL db.relationshipTypes() YIELD relationshipType "
+        "RETURN etichette, collect(relationshipType) AS tipi"
+    ).single()
+    etichette, tipi = meta["etichette"], meta["tipi"]
+    parti = [
+        "CALL { MATCH (n) RETURN count(n) AS nodi }",
+        "CALL { MATCH ()-[r]->() RETURN count(r) AS relazioni }",
+    ]
+    parti += [f"CALL {{ MATCH (n:{_q(l)}) RETURN count(n) AS l{i} }}" for i, l in enumerate(etichette)]
+    parti += [f"CALL {{ MATCH ()-[r:{_q(t)}]->() RETURN count(r) AS t{i} }}" for i, t in enumerate(tipi)]
+    rec = session.run(
+        "\n".join(parti) + _CAMPIONE
+        + "RETURN nodi, relazioni, campione, "
+        + "[" + ", ".join(f"l{i}" for i in range(len(etichette))) + "] AS lc, "
+        + "[" + ", ".join(f"t{i}" for i in range(len(tipi))) + "] AS tc"
+    ).single()
+    return {
+        "nodi": rec["nodi"],
+        "relazioni": rec["relazioni"],
+        "etichette": dict(zip(etichette, rec["lc"])),
+        "tipi": dict(zip(tipi, rec["tc"])),
+        "campione": rec["campione"],
+    }
+
+
+def statistiche(session, ttl: float = STATS_TTL_S) -> dict:
+    """
+    Conteggi totali, per etichetta e per tipo di relazione, più un campione
+    di nomi di Entity. Il risultato resta in cache per *ttl* secondi.
+    """
+    db = get_connection().config.database
+    hit = _stats_cache.get(db)
+    if hit is not None and hit[0] > time.monotonic():
+        return hit[1]
+    try:
+        stats = _statistiche_apoc(session)
+    except Exception:  # APOC non installato
+        stats = _statistiche_count_store(session)
+    _stats_cache[db] = (time.monotonic() + ttl, stats)
+    return stats
+
+
 def gds_available(session) -> bool:
     """Restituisce True se il plug‑in Graph Data Science è installato."""
     try:
@@ -30,26 +108,131 @@ def gds_available(session) -> bool:
     except Exception:
         return False
 
+# ------------------------------------------------------------
+# Proiezione GDS riutilizzabile
+# ------------------------------------------------------------
+PROJ_PREFIX = "kgReport_"
+# 0 = betweenness esatta; N > 0 = stima con N nodi sorgente campionati
+BTW_SAMPLING = int(os.getenv("GDS_BETWEENNESS_SAMPLING", "0"))
+
+
+def _firma(session, labels, sampling: int) -> str:
+    """Impronta del grafo: conteggi per etichetta e relazioni (count store)."""
+    counts = [
+        session.run(f"MATCH (n:`{l}`) RETURN count(n) AS c").single()["c"]
+        for l in labels
+    ]
+    rels = session.run("MATCH ()-[r]->() RETURN count(r) AS c").single()["c"]
+    raw = repr((sorted(labels), counts, rels, sampling))
+    return hashlib.blake2b(raw.encode(), digest_size=6).hexdigest()
+
+
+def proiezione(session, labels, sampling: int = BTW_SAMPLING, refresh: bool = False) -> str:
+    """
+    Ritorna il nome di una proiezione GDS con le proprietà 'grado' e 'btw'
+    già calcolate. La proiezione resta nel catalogo GDS e viene riusata
+    finché i conteggi di nodi/relazioni (o il campionamento) non cambiano;
+    in quel caso le proiezioni vecchie sono eliminate e si riproietta.
+    """
+    nome = PROJ_PREFIX + _firma(session, labels, sampling)
+    esistenti = [
+        r["graphName"]
+        for r in session.run("CALL gds.graph.list() YIELD graphName RETURN graphName")
+    ]
+    if nome in esistenti and not refresh:
+        return nome
+
+    for g in esistenti:
+        if g.startswith(PROJ_PREFIX):
+            session.run("CALL gds.graph.drop($g, false) YIELD graphName RETURN graphName",
+                        g=g).consume()
+
+    session.run(
+        "CALL gds.graph.project($g, $labels, { ALL: { type:'*', orientation:'UNDIRECTED' } })",
+        g=nome, labels=list(labels),
+    ).consume()
+    session.run("CALL gds.degree.mutate($g, { mutateProperty:'grado' })", g=nome).consume()
+    cfg = {"mutateProperty": "btw"}
+    if sampling > 0:
+        cfg.update(samplingSize=sampling, samplingSeed=42)
+    session.run("CALL gds.betweenness.mutate($g, $cfg)", g=nome, cfg=cfg).consume()
+    return nome
+
+
+def elimina_proiezioni(session) -> None:
+    """Rimuove dal catalogo GDS tutte le proiezioni del report."""
+    for r in session.run("CALL gds.graph.list() YIELD graphName RETURN graphName"):
+        if r["graphName"].startswith(PROJ_PREFIX):
+            session.run("CALL gds.graph.drop($g, false) YIELD graphName RETURN graphName",
+                        g=r["graphName"]).consume()
+
+# ------------------------------------------------------------
+# Backend locale (CSR NumPy/SciPy) per installazioni senza GDS
+# ------------------------------------------------------------
+def get_hubs_locale(session, k: int = 5):
+    """
+    Hub calcolati in locale su un CSR memory‑mapped (graphdb.analytics),
+    ricostruito solo quando cambiano i conteggi del grafo. La betweenness
+    è stimata con BTW_SAMPLING sorgenti (256 se non impostato).
+    """
+    from graphdb import analytics
+
+    g = analytics.load_or_build(session)
+    deg = analytics.degree(g)
+    top = analytics.top_k(deg, k)
+    if not len(top):
+        return []
+    btw = analytics.betweenness(g, BTW_SAMPLING or 256)
+
+    ids = [int(g.node_ids[i]) for i in top]
+    props = {
+        rec["id"]: rec
+        for rec in session.run(
+            """
+            MATCH (n) WHERE id(n) IN $ids
+            RETURN id(n) AS id,
+                   coalesce(n.name, n.filename, n.index) AS nome,
+                   labels(n)[0]                          AS etichetta
+            """,
+            ids=ids,
+        )
+    }
+    return [
+        {
+            "nome"     : props[nid]["nome"] if nid in props else None,
+            "etichetta": props[nid]["etichetta"] if nid in props else None,
+            "grado"    : int(deg[i]),
+            "btw"      : int(btw[i]),
+        }
+        for i, nid in zip(top, ids)
+    ]
+
 # ------------------------------------------------------------
 # Hub detector (con o senza GDS)
 # ------------------------------------------------------------
-def get_hubs(session, use_gds: bool):
+def get_hubs(session, use_gds: bool, k: int = 5):
     """
-    Ritorna massimo 5 hub con struttura:
+    Ritorna massimo k hub con struttura:
         {nome, etichetta, grado, btw}
+    Il top‑k è calcolato sul server: al client arrivano solo k righe.
     """
-    # ---------- fallback semplice ----------------------------
+    # ---------- senza GDS: backend locale, poi Cypher ---------
     if not use_gds:
+        try:
+            return get_hubs_locale(session, k)
+        except ImportError:  # NumPy/SciPy non installati
+            pass
         return session.run(
             """
             MATCH (n)-[r]-()
             WITH n, count(r) AS grado
-            ORDER BY grado DESC LIMIT 5
+            ORDER BY grado DESC LIMIT $k
             RETURN coalesce(n.name,n.filename,n.index) AS nome,
                    labels(n)[0]                       AS etichetta,
                    grado                               AS grado,
                    0                                   AS btw
-            """
+            """,
+            k=k,
         ).data()
 
     # ---------- GDS disponibile ------------------------------
@@ -60,76 +243,45 @@ def get_hubs(session, use_gds: bool):
     target = ["Entity", "Paragraph", "Document"]
     keep   = [l for l in target if l in presenti]
     if not keep:
-        return get_hubs(session, use_gds=False)
-
-    lbl_str = "[" + ",".join(f"'{l}'" for l in keep) + "]"
-
-    # -- NEW: se 'tmpGraph' esiste lo cancelliamo ---------------
-    session.run(
-        """
-        CALL gds.graph.exists('tmpGraph') YIELD exists
-        WITH exists
-        CALL apoc.do.when(
-              exists,
-              'CALL gds.graph.drop("tmpGraph") YIELD graphName RETURN graphName',
-              'RETURN null AS graphName',
-              {}
-        ) YIELD value
-        RETURN value.graphName
-        """
-    )
+        return get_hubs(session, use_gds=False, k=k)
 
-    # proiezione
-    session.run(
-        f"""
-        CALL gds.graph.project(
-          'tmpGraph',
-          {lbl_str},
-          {{ ALL: {{ type:'*', orientation:'UNDIRECTED' }} }}
-        )
-        """
-    )
+    nome = proiezione(session, keep)
 
     # ----------------------------------------------------------
-    #  (resto della funzione invariato)
+    #  top‑k per grado + proprietà dei soli k nodi, in una query
     # ----------------------------------------------------------
-    degree = {
-        rec["nodeId"]: rec["grado"]
-        for rec in session.run(
-            "CALL gds.degree.stream('tmpGraph') "
-            "YIELD nodeId, score AS grado RETURN nodeId, grado"
-        )
-    }
+    top = session.run(
+        """
+        CALL gds.graph.nodeProperty.stream($g, 'grado') YIELD nodeId, propertyValue
+        WITH nodeId, propertyValue AS score ORDER BY score DESC LIMIT $k
+        WITH nodeId, score, gds.util.asNode(nodeId) AS n
+        RETURN nodeId,
+               coalesce(n.name, n.filename, n.index) AS nome,
+               labels(n)[0]                          AS etichetta,
+               score                                 AS grado
+        """,
+        g=nome, k=k,
+    ).data()
 
+    # betweenness (già calcolata nella proiezione) solo per i k nodi
     btw = {
         rec["nodeId"]: rec["btw"]
         for rec in session.run(
-            "CALL gds.betweenness.stream('tmpGraph') "
-            "YIELD nodeId, score AS btw RETURN nodeId, btw"
+            "CALL gds.graph.nodeProperty.stream($g, 'btw') YIELD nodeId, propertyValue "
+            "WHERE nodeId IN $ids RETURN nodeId, propertyValue AS btw",
+            g=nome, ids=[t["nodeId"] for t in top],
         )
     }
 
-        
-    combined = []
-    for node_id, grado in degree.items():
-        n = session.run(
-            "MATCH (n) WHERE id(n) = $id RETURN n", id=node_id
-        ).single()["n"]
-
-        combined.append(
-            {
-                "nome"     : n.get("name", n.get("filename", n.get("index"))),
-                "etichetta": list(n.labels)[0],
-                "grado"    : int(grado),
-                "btw"      : int(btw.get(node_id, 0)),
-            }
-        )
-        
-
-    combined.sort(key=lambda x: x["grado"], reverse=True)
-    hubs = combined[:5]
-
-    session.run("CALL gds.graph.drop('tmpGraph')")
+    hubs = [
+        {
+            "nome"     : t["nome"],
+            "etichetta": t["etichetta"],
+            "grado"    : int(t["grado"]),
+            "btw"      : int(btw.get(t["nodeId"], 0)),
+        }
+        for t in top
+    ]
     return hubs
 
 
@@ -138,30 +290,18 @@ def get_hubs(session, use_gds: bool):
 # Narrazione in italiano
 # ------------------------------------------------------------
 def descrivi_grafo():
-    with driver.session() as s:
-        # statistiche di base
-        nodes = s.run("MATCH (n) RETURN count(n) AS c").single()["c"]
-        rels  = s.run("MATCH ()-[r]->() RETURN count(r) AS c").single()["c"]
-        labels = query_list(s, "CALL db.labels() YIELD label RETURN label ORDER BY label")
-        rtypes = query_list(
-            s,
-            "CALL db.relationshipTypes() YIELD relationshipType "
-            "RETURN relationshipType ORDER BY relationshipType",
-        )
+    with get_connection().session() as s:
+        # statistiche di base + campione di nomi (un round trip, in cache)
+        stats  = statistiche(s)
+        nodes, rels = stats["nodi"], stats["relazioni"]
+        labels = sorted(stats["etichette"])
+        rtypes = sorted(stats["tipi"])
+        sample_names = stats["campione"]
 
         # hub & tema principale
         gds_ok = gds_available(s)
         hubs   = get_hubs(s, gds_ok)
 
-        sample_names = query_list(
-            s,
-            """
-            MATCH (e:Entity) WHERE e.name IS NOT NULL
-            WITH e.name AS n LIMIT 1000
-            RETURN n
-            """
-        )
-
     # inferenza tema
     tokens = [
         w.lower()
@@ -176,13 +316,13 @@ def descrivi_grafo():
     frasi = [
         f"Il grafo contiene **{nodes:,} nodi** e **{rels:,} relazioni**, "
         f"organizzati attorno alle etichette "
-        + ", ".join(f"`{l}`" for l in labels) + "."
+        + ", ".join(f"`{l}` ({stats['etichette'][l]:,})" for l in labels) + "."
     ]
 
     if rtypes:
         frasi.append(
             "Le relazioni principali sono "
-            + ", ".join(f"`:{t}`" for t in rtypes) + "."
+            + ", ".join(f"`:{t}` ({stats['tipi'][t]:,})" for t in rtypes) + "."
         )
 
     frasi.append(
@@ -194,7 +334,7 @@ def descrivi_grafo():
         descr = []
         for h in hubs:
             part = f"{h['nome']} (`{h['etichetta']}`, grado {h['grado']}"
-            if gds_ok and h["btw"]:
+            if h["btw"]:
                 part += f", betweenness {h['btw']}"
             descr.append(part + ")")
         frasi.append(
@@ -207,4 +347,4 @@ def descrivi_grafo():
 # ------------------------------------------------------------
 if __name__ == "__main__":
     descrivi_grafo()
-    driver.close()
+    close_connection()
@@ -0,0 +1,94 @@
+# bench_imports.py
+"""Import‑time benchmark for the project's entry modules.
+
+Each module is imported in a fresh interpreter with ``-X importtime``,
+several times, and the median cumulative import time is reported together
+with the slowest third‑party packages it pulled in.  Anything a module
+prints while being imported is flagged, since imports should be free of
+side effects.
+
+    python bench_imports.py
+    python bench_imports.py ingest graphdb.graph_builder --repeat 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent
+
+DEFAULT_MODULES = [
+    "ingest",
+    "main",
+    "preprocess.text_extractor",
+    "gemini.gemini_client",
+    "graphdb.graph_builder",
+]
+
+_LOCAL = {"preprocess", "gemini", "graphdb", "ingest", "main"}
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile(module: str) -> Tuple[Dict[str, int], str]:
+    """Import *module* in a fresh interpreter; return the cumulative µs of
+    *module* and of every third‑party package it loaded, and whatever it
+    wrote to stdout."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}" if module else "pass"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr.strip().splitlines()[-1]}")
+    cumulative: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        name = m.group(4)
+        if name == module or ("." not in name and not name.startswith("_")
+                              and name not in _LOCAL and name not in sys.stdlib_module_names):
+            cumulative[name] = max(cumulative.get(name, 0), int(m.group(2)))
+    return cumulative, proc.stdout
+
+
+def bench(module: str, repeat: int, top: int) -> None:
+    startup = set(import_profile("")[0])  # loaded by site.py for every interpreter
+    runs: List[Dict[str, int]] = []
+    output = ""
+    for _ in range(repeat):
+        profile, output = import_profile(module)
+        runs.append(profile)
+    total = statistics.median(r.get(module, 0) for r in runs) / 1000
+    print(f"{module:<28} {total:8.1f} ms")
+    deps = {name for r in runs for name in r} - {module} - startup
+    heavy = sorted(deps, key=lambda n: -statistics.median(r.get(n, 0) for r in runs))
+    for name in heavy[:top]:
+        ms = statistics.median(r.get(name, 0) for r in runs) / 1000
+        if ms < 1.0:
+            break
+        print(f"    {name:<24} {ms:8.1f} ms")
+    if output.strip():
+        print(f"    ⚠️ printed on import: {output.strip().splitlines()[0]!r}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    ap.add_argument("--repeat", type=int, default=5, help="fresh interpreters per module")
+    ap.add_argument("--top", type=int, default=3, help="slowest dependencies to list")
+    args = ap.parse_args(argv)
+    for module in args.modules:
+        try:
+            bench(module, args.repeat, args.top)
+        except RuntimeError as e:
+            print(f"⚠️ {e}")
+
+
+if __name__ == "__main__":
+    main()
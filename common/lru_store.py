@@ -0,0 +1,127 @@
+# common/lru_store.py
+"""SQLite key/value store with least‑recently‑used and age eviction.
+
+Shared by the Gemini result cache (``gemini.cache``) and the OCR page cache
+(``preprocess.ocr_cache``); each keeps its entries in its own table.  The
+total entry size is kept up to date by triggers, so a store never rescans
+the table.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+
+class LRUStore:
+    """SQLite‑backed text store with size/age eviction and hit/miss counters.
+
+    WAL mode and a busy timeout let several processes share one file.
+    Subclasses choose the table and override :meth:`_dumps` / :meth:`_loads`
+    to store something other than plain text.
+    """
+
+    table = "entries"
+
+    def __init__(self, path: str | Path, max_bytes: int,
+                 max_age_s: Optional[float] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        t = self.table
+        self._db.executescript(
+            f"""CREATE TABLE IF NOT EXISTS {t} (
+                   key        TEXT PRIMARY KEY,
+                   value      TEXT NOT NULL,
+                   size       INTEGER NOT NULL,
+                   created_at REAL NOT NULL,
+                   accessed_at REAL NOT NULL
+               );
+               CREATE INDEX IF NOT EXISTS {t}_accessed ON {t}(accessed_at);
+               CREATE INDEX IF NOT EXISTS {t}_created ON {t}(created_at);
+               -- running total of `size`, seeded once from existing rows
+               CREATE TABLE IF NOT EXISTS {t}_total (id INTEGER PRIMARY KEY CHECK (id = 0),
+                                                   bytes INTEGER NOT NULL);
+               INSERT OR IGNORE INTO {t}_total SELECT 0, COALESCE(SUM(size), 0) FROM {t};
+               CREATE TRIGGER IF NOT EXISTS {t}_ins AFTER INSERT ON {t}
+                   BEGIN UPDATE {t}_total SET bytes = bytes + NEW.size; END;
+               CREATE TRIGGER IF NOT EXISTS {t}_del AFTER DELETE ON {t}
+                   BEGIN UPDATE {t}_total SET bytes = bytes - OLD.size; END;
+               CREATE TRIGGER IF NOT EXISTS {t}_upd AFTER UPDATE OF size ON {t}
+                   BEGIN UPDATE {t}_total SET bytes = bytes + NEW.size - OLD.size; END;"""
+        )
+        self._db.commit()
+
+    def _dumps(self, value: Any) -> str:
+        return value
+
+    def _loads(self, data: str) -> Any:
+        return data
+
+    # ── lookup / store ──────────────────────────────────────────
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.max_age_s is not None and now - row[1] > self.max_age_s):
+                self.misses += 1
+                return None
+            self._db.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+        return self._loads(row[0])
+
+    def put(self, key: str, value: Any) -> None:
+        data = self._dumps(value)
+        now = time.time()
+        with self._lock:
+            # an upsert (not INSERT OR REPLACE) so the size triggers see the old row
+            self._db.execute(
+                f"""INSERT INTO {self.table} VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value, size = excluded.size,
+                        created_at = excluded.created_at, accessed_at = excluded.accessed_at""",
+                (key, data, len(data.encode("utf-8")), now, now),
+            )
+            self._evict(now)
+            self._db.commit()
+
+    # ── eviction ────────────────────────────────────────────────
+    def _evict(self, now: float) -> None:
+        if self.max_age_s is not None:
+            self._db.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (now - self.max_age_s,))
+        total = self._total()
+        if total <= self.max_bytes:
+            return
+        # drop least‑recently‑used entries until we are back under budget
+        excess = total - self.max_bytes
+        freed = 0
+        doomed = []
+        for key, size in self._db.execute(f"SELECT key, size FROM {self.table} ORDER BY accessed_at"):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._db.executemany(f"DELETE FROM {self.table} WHERE key = ?", doomed)
+
+    def _total(self) -> int:
+        return self._db.execute(f"SELECT bytes FROM {self.table}_total").fetchone()[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db.execute(f"SELECT count(*) FROM {self.table}").fetchone()[0]
+            size = self._total()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+    def close(self) -> None:
+        self._db.close()
@@ -0,0 +1,9 @@
+# common/tokens.py
+"""Token count estimate shared by prompt chunking and preprocessing reports."""
+
+# Rough heuristic for Gemini tokenisation (~4 characters per token)
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
@@ -0,0 +1,71 @@
+# gemini/cache.py
+"""Persistent, content‑addressed cache for Gemini extraction results.
+
+Entries are keyed by ``sha256(normalized text | model | prompt version)`` and
+stored as JSON in a small SQLite file, so unchanged documents never hit the
+API twice.  Old or excess entries are evicted by age and total size (see
+``common.lru_store``, which the OCR page cache uses as well).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Optional
+
+from common.lru_store import LRUStore
+
+DEFAULT_PATH = Path(__file__).resolve().parents[1] / ".cache" / "gemini_cache.sqlite"
+
+_WS = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so cosmetic re‑extraction differences keep the key."""
+    return _WS.sub(" ", text).strip()
+
+
+def cache_key(text: str, model_name: str, prompt_version: str) -> str:
+    h = hashlib.sha256()
+    for part in (normalize_text(text), model_name, prompt_version):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class ResultCache(LRUStore):
+    """JSON values in the shared LRU store, expiring after *max_age_s*."""
+
+    table = "results"
+
+    def __init__(self, path: str | Path = DEFAULT_PATH,
+                 max_bytes: int = 512 * 1024 * 1024,
+                 max_age_s: Optional[float] = 90 * 24 * 3600):
+        super().__init__(path, max_bytes, max_age_s)
+
+    def _dumps(self, value: Any) -> str:
+        return json.dumps(value, ensure_ascii=False)
+
+    def _loads(self, data: str) -> Any:
+        return json.loads(data)
+
+
+_cache: Optional[ResultCache] = None
+
+
+def get_cache() -> Optional[ResultCache]:
+    """Return the process‑wide cache, or ``None`` if disabled via GEMINI_CACHE=0."""
+    global _cache
+    if os.getenv("GEMINI_CACHE", "1") == "0":
+        return None
+    if _cache is None:
+        max_age_days = float(os.getenv("GEMINI_CACHE_MAX_AGE_DAYS", "90"))
+        _cache = ResultCache(
+            os.getenv("GEMINI_CACHE_PATH", str(DEFAULT_PATH)),
+            max_bytes=int(float(os.getenv("GEMINI_CACHE_MAX_MB", "512")) * 1024 * 1024),
+            max_age_s=max_age_days * 24 * 3600 if max_age_days > 0 else None,
+        )
+    return _cache
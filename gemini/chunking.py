@@ -0,0 +1,150 @@
+# gemini/chunking.py
+"""Split long documents into prompt‑sized windows and merge the per‑chunk
+extraction results back into a single hierarchy / schema / Cypher spec.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Iterable, List, Tuple
+
+from common.tokens import estimate_tokens
+
+
+def chunk_paragraphs(paragraphs: Iterable[str], max_tokens: int = 6000,
+                     overlap_tokens: int = 400) -> List[str]:
+    """Greedily pack paragraphs into windows of at most *max_tokens*.
+
+    Each window after the first starts with the trailing paragraphs of the
+    previous one (up to *overlap_tokens*) so entities straddling a boundary
+    are seen in full by at least one chunk.  A single paragraph longer than
+    the budget becomes its own window.
+    """
+    chunks: List[str] = []
+    window: List[str] = []
+    size = 0
+    for para in paragraphs:
+        cost = estimate_tokens(para)
+        if window and size + cost > max_tokens:
+            chunks.append("\n".join(window))
+            # carry the tail of this window over as overlap
+            carry: List[str] = []
+            carried = 0
+            for prev in reversed(window):
+                c = estimate_tokens(prev)
+                if carried + c > overlap_tokens:
+                    break
+                carry.insert(0, prev)
+                carried += c
+            if carried + cost > max_tokens:
+                carry, carried = [], 0
+            window, size = carry, carried
+        window.append(para)
+        size += cost
+    if window:
+        chunks.append("\n".join(window))
+    return chunks
+
+
+# ──────────────────────────────────────────────────────────────
+# Reduce step
+# ──────────────────────────────────────────────────────────────
+
+_WS = re.compile(r"\s+")
+
+
+def _merge_schema_items(items: Iterable[dict], keys: Tuple[str, ...]) -> List[dict]:
+    """Union schema entries identified by *keys*.  Properties keep the shape
+    the model used: a list of names, or a name → type map."""
+    merged: dict = {}
+    for item in items:
+        if not isinstance(item, dict) or keys[0] not in item:
+            continue
+        props = item.get("properties")
+        key = tuple(item.get(k) for k in keys)
+        entry = merged.get(key)
+        if entry is None:
+            # copied, so merging never mutates the per‑chunk results
+            merged[key] = {**item, "properties": type(props)(props)} if props else dict(item)
+            continue
+        have = entry.get("properties")
+        if isinstance(have, list) and isinstance(props, list):
+            have.extend(p for p in props if p not in have)
+        elif isinstance(have, dict) and isinstance(props, dict):
+            for name, typ in props.items():
+                have.setdefault(name, typ)
+        elif not have and props:
+            entry["properties"] = props
+    return list(merged.values())
+
+
+def _merge_hierarchies(hierarchies: List) -> Any:
+    """Concatenate per‑chunk section lists (dropping a section repeated across
+    a chunk boundary by the overlap); outline dicts from older prompts go
+    under a single root."""
+    if all(isinstance(h, list) for h in hierarchies):
+        sections: List = []
+        for h in hierarchies:
+            for section in h:
+                if not (sections and section == sections[-1]):
+                    sections.append(section)
+        return sections
+    return {"root": "Document", "children": hierarchies}
+
+
+def empty_result() -> dict:
+    return {"hierarchy": {}, "schema": {"nodes": [], "relationships": []}, "nodes": [], "edges": []}
+
+
+def merge_results(results: List[dict]) -> dict:
+    """Combine per‑chunk ``{"hierarchy", "schema", "nodes", "edges"}`` dicts.
+
+    * hierarchy – chunk section lists are concatenated in order;
+    * schema    – node labels and (type, from, to) relationships are unioned,
+      properties merged; every part keeps the shape of a single‑chunk result;
+    * nodes/edges – local node ids are prefixed with the chunk index so they
+      cannot collide; entities repeated across chunks collapse later in the
+      graph IR, which keys nodes by label and ``name``;
+    * cypher    – (legacy output) statements are deduplicated
+      (whitespace‑insensitive), so an entity MERGEd by several overlapping
+      chunks is written once.
+    """
+    if len(results) == 1:
+        return results[0]
+
+    hierarchy = _merge_hierarchies([r.get("hierarchy") for r in results if r.get("hierarchy")])
+
+    node_items, rel_items = [], []
+    for r in results:
+        schema = r.get("schema") or {}
+        if isinstance(schema, dict):
+            node_items.extend(schema.get("nodes") or [])
+            rel_items.extend(schema.get("relationships") or [])
+    schema = {
+        "nodes": _merge_schema_items(node_items, ("label",)),
+        "relationships": _merge_schema_items(rel_items, ("type", "from", "to")),
+    }
+
+    nodes: List[dict] = []
+    edges: List[dict] = []
+    for i, r in enumerate(results):
+        for n in r.get("nodes") or []:
+            if isinstance(n, dict):
+                nodes.append({**n, "id": f"c{i}:{n.get('id')}"})
+        for e in r.get("edges") or []:
+            if isinstance(e, dict):
+                edges.append({**e, "source": f"c{i}:{e.get('source')}", "target": f"c{i}:{e.get('target')}"})
+
+    seen = set()
+    cypher: List[str] = []
+    for r in results:
+        for stmt in r.get("cypher") or []:
+            norm = _WS.sub(" ", stmt).strip().rstrip(";")
+            if norm and norm not in seen:
+                seen.add(norm)
+                cypher.append(stmt)
+
+    merged = {"hierarchy": hierarchy, "schema": schema, "nodes": nodes, "edges": edges}
+    if cypher:
+        merged["cypher"] = cypher
+    return merged
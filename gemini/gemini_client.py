@@ -2,18 +2,342 @@
 
 import os
 import json
-import google.generativeai as genai
-from dotenv import load_dotenv, find_dotenv
+import random
+import time
+import asyncio
+import weakref
+import threading
 from json import JSONDecodeError
-from google.generativeai import types
-
-# Load project‑root .env so that GEMINI_API_KEY loads correctly
-load_dotenv(find_dotenv())
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator, List, Tuple
+from gemini.cache import cache_key, get_cache
+from common.tokens import estimate_tokens
+from gemini.chunking import chunk_paragraphs, empty_result, merge_results
+from gemini.rate_limit import RateLimiter
+from gemini.streaming import STREAMED_KEYS, ArrayElementStream
 
 # ────────────────  Gemini configuration  ────────────────
 # You can switch model versions here if needed (e.g. "models/gemini-1.5-pro-latest")
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel(model_name="models/gemini-2.0-flash")
+MODEL_NAME = "models/gemini-2.0-flash"
+
+# Bump whenever the extraction prompt changes so cached results are not reused
+PROMPT_VERSION = "4"
+
+# The SDK (~1 s to import), the project .env and the model client are all
+# loaded on first use, so importing this module has no side effects.
+_model = None
+_limits = None
+_init_lock = threading.Lock()
+
+
+def _load_env() -> None:
+    # Load project‑root .env so that GEMINI_API_KEY loads correctly
+    from dotenv import load_dotenv, find_dotenv
+    load_dotenv(find_dotenv())
+
+
+def get_model():
+    """Configured ``GenerativeModel``, created on first use."""
+    global _model
+    if _model is None:
+        with _init_lock:
+            if _model is None:
+                import google.generativeai as genai
+                _load_env()
+                genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                _model = genai.GenerativeModel(model_name=MODEL_NAME)
+    return _model
+
+
+# ────────────────  Quota / concurrency  ────────────────
+class _Limits:
+    """Quota settings, read from the environment on first use."""
+
+    def __init__(self):
+        _load_env()
+        self.max_concurrency = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+        self.max_retries     = int(os.getenv("GEMINI_MAX_RETRIES", "5"))
+        self.backoff_base_s  = float(os.getenv("GEMINI_BACKOFF_BASE_S", "1.0"))
+        self.backoff_max_s   = float(os.getenv("GEMINI_BACKOFF_MAX_S", "60.0"))
+        self.rate_limiter = RateLimiter(
+            requests_per_minute=float(os.getenv("GEMINI_RPM", "1000")),
+            tokens_per_minute=float(os.getenv("GEMINI_TPM", "1000000")),
+        )
+        self.sync_semaphore = threading.BoundedSemaphore(self.max_concurrency)
+
+
+def limits() -> _Limits:
+    global _limits
+    if _limits is None:
+        with _init_lock:
+            if _limits is None:
+                _limits = _Limits()
+    return _limits
+
+
+# asyncio.Semaphore is bound to one event loop, so keep one per loop
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def _semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    sem = _semaphores.get(loop)
+    if sem is None:
+        sem = _semaphores[loop] = asyncio.Semaphore(limits().max_concurrency)
+    return sem
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    lim = limits()
+    return random.uniform(0, min(lim.backoff_max_s, lim.backoff_base_s * 2 ** attempt))
+
+
+def _is_retryable(exc: Exception) -> bool:
+    """429 (quota) and 5xx (server) errors are worth retrying."""
+    from google.api_core import exceptions as gexc
+    return isinstance(exc, (gexc.TooManyRequests, gexc.ResourceExhausted,
+                            gexc.ServerError, gexc.DeadlineExceeded))
+
+
+async def generate_content_async(prompt: str, **kwargs):
+    """Rate‑limited, concurrency‑bounded ``model.generate_content_async``
+    with exponential backoff and full jitter on 429/5xx."""
+    lim, model = limits(), get_model()
+    async with _semaphore():
+        for attempt in range(lim.max_retries + 1):
+            await lim.rate_limiter.acquire(estimate_tokens(prompt))
+            try:
+                return await model.generate_content_async(prompt, **kwargs)
+            except Exception as e:
+                if attempt == lim.max_retries or not _is_retryable(e):
+                    raise
+                delay = _backoff_delay(attempt)
+                print(f"⚠️ Gemini {type(e).__name__}, retry {attempt + 1}/{lim.max_retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+
+def generate_content(prompt: str, **kwargs):
+    """Blocking counterpart of :func:`generate_content_async` for sync callers.
+
+    Shares the same rate limiter and retry policy; it does not go through
+    ``asyncio.run`` because the SDK's async gRPC channel is bound to the
+    first event loop that uses it.
+    """
+    lim, model = limits(), get_model()
+    with lim.sync_semaphore:
+        for attempt in range(lim.max_retries + 1):
+            wait = lim.rate_limiter.reserve(estimate_tokens(prompt))
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                return model.generate_content(prompt, **kwargs)
+            except Exception as e:
+                if attempt == lim.max_retries or not _is_retryable(e):
+                    raise
+                delay = _backoff_delay(attempt)
+                print(f"⚠️ Gemini {type(e).__name__}, retry {attempt + 1}/{lim.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+
+def generate_content_stream(prompt: str, **kwargs) -> Iterator[str]:
+    """``model.generate_content(stream=True)`` yielding text pieces as they
+    arrive.  The concurrency slot is held until the stream is exhausted;
+    failures are retried only before the first piece has been yielded."""
+    lim, model = limits(), get_model()
+    with lim.sync_semaphore:
+        for attempt in range(lim.max_retries + 1):
+            wait = lim.rate_limiter.reserve(estimate_tokens(prompt))
+            if wait > 0:
+                time.sleep(wait)
+            started = False
+            try:
+                for chunk in model.generate_content(prompt, stream=True, **kwargs):
+                    try:
+                        piece = chunk.text
+                    except ValueError:  # chunk without text parts (e.g. finish reason only)
+                        continue
+                    started = True
+                    yield piece
+                return
+            except Exception as e:
+                if started or attempt == lim.max_retries or not _is_retryable(e):
+                    raise
+                delay = _backoff_delay(attempt)
+                print(f"⚠️ Gemini {type(e).__name__}, retry {attempt + 1}/{lim.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+
+# ────────────────  Native JSON output  ────────────────
+# Response schema for the extraction (OpenAPI subset accepted by Gemini).
+# Free‑form property maps cannot be expressed, so node/edge properties are
+# requested as {key, value} pairs and turned back into dicts on parsing.
+_PROPERTY_PAIRS = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {"key": {"type": "STRING"}, "value": {"type": "STRING"}},
+        "required": ["key", "value"],
+    },
+}
+RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "nodes": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "id": {"type": "STRING"},
+                    "label": {"type": "STRING"},
+                    "properties": _PROPERTY_PAIRS,
+                },
+                "required": ["id", "label", "properties"],
+            },
+        },
+        "relationships": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "source": {"type": "STRING"},
+                    "target": {"type": "STRING"},
+                    "type": {"type": "STRING"},
+                    "properties": _PROPERTY_PAIRS,
+                },
+                "required": ["source", "target", "type"],
+            },
+        },
+        "schema": {
+            "type": "OBJECT",
+            "properties": {
+                "nodes": {
+                    "type": "ARRAY",
+                    "items": {
+                        "type": "OBJECT",
+                        "properties": {
+                            "label": {"type": "STRING"},
+                            "properties": {"type": "ARRAY", "items": {"type": "STRING"}},
+                        },
+                        "required": ["label", "properties"],
+                    },
+                },
+                "relationships": {
+                    "type": "ARRAY",
+                    "items": {
+                        "type": "OBJECT",
+                        "properties": {
+                            "type": {"type": "STRING"},
+                            "from": {"type": "STRING"},
+                            "to": {"type": "STRING"},
+                        },
+                        "required": ["type", "from", "to"],
+                    },
+                },
+            },
+            "required": ["nodes", "relationships"],
+        },
+        "sections": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "title": {"type": "STRING"},
+                    "level": {"type": "INTEGER"},
+                    "summary": {"type": "STRING"},
+                },
+                "required": ["title", "level"],
+            },
+        },
+    },
+    "required": ["nodes", "relationships", "schema", "sections"],
+}
+
+# Response keys as the model writes them → the names used everywhere else.
+# google-generativeai 0.8 cannot set a property ordering, so constrained
+# output comes back with its keys sorted alphabetically; these names put the
+# node and relationship arrays ahead of the schema and the outline, so a
+# streamed response delivers nodes first and their edges right after them.
+_RESPONSE_KEYS = {"relationships": "edges", "sections": "hierarchy"}
+_WIRE_KEYS = {v: k for k, v in _RESPONSE_KEYS.items()}
+
+# Tried in order: JSON constrained by RESPONSE_SCHEMA, plain JSON mode, free
+# text.  A mode the SDK or the model rejects is dropped for the process.
+_JSON_MODES = ("schema", "json", "text")
+_json_mode = 0
+
+
+def _generation_kwargs(mode: int) -> dict:
+    if _JSON_MODES[mode] == "schema":
+        return {"generation_config": {"response_mime_type": "application/json",
+                                      "response_schema": RESPONSE_SCHEMA}}
+    if _JSON_MODES[mode] == "json":
+        return {"generation_config": {"response_mime_type": "application/json"}}
+    return {}
+
+
+def _downgrade_json_mode(mode: int, exc: Exception) -> bool:
+    """Fall back from *mode* if *exc* says it is unsupported: an older SDK
+    fails to build the request (TypeError/ValueError/KeyError) or the model
+    answers 400 about the response settings.  Returns whether the call
+    should be retried."""
+    from google.api_core import exceptions as gexc
+    global _json_mode
+    if _JSON_MODES[mode] == "text":
+        return False
+    rejected = isinstance(exc, gexc.InvalidArgument) and "response" in str(exc).lower()
+    if not (rejected or isinstance(exc, (TypeError, ValueError, KeyError))):
+        return False
+    with _init_lock:
+        if _json_mode == mode:
+            _json_mode += 1
+            print(f"⚠️ Gemini JSON mode {_JSON_MODES[mode]!r} unsupported "
+                  f"({type(exc).__name__}: {exc}); using {_JSON_MODES[_json_mode]!r}")
+    return True
+
+
+def _generate_json(prompt: str):
+    while True:
+        mode = _json_mode
+        try:
+            return generate_content(prompt, **_generation_kwargs(mode))
+        except Exception as e:
+            if not _downgrade_json_mode(mode, e):
+                raise
+
+
+async def _generate_json_async(prompt: str):
+    while True:
+        mode = _json_mode
+        try:
+            return await generate_content_async(prompt, **_generation_kwargs(mode))
+        except Exception as e:
+            if not _downgrade_json_mode(mode, e):
+                raise
+
+
+def _stream_json(prompt: str) -> Iterator[str]:
+    while True:
+        mode = _json_mode
+        started = False
+        try:
+            for piece in generate_content_stream(prompt, **_generation_kwargs(mode)):
+                started = True
+                yield piece
+            return
+        except Exception as e:
+            if started or not _downgrade_json_mode(mode, e):
+                raise
+
+
+def _normalize_element(item: Any) -> Any:
+    """``[{key, value}, …]`` property lists (schema mode) → plain dicts."""
+    if isinstance(item, dict) and isinstance(item.get("properties"), list):
+        item = {**item, "properties": {
+            p["key"]: p.get("value")
+            for p in item["properties"] if isinstance(p, dict) and p.get("key")
+        }}
+    return item
 
 
 ############################################
@@ -40,13 +364,101 @@ def extract_json(s: str) -> str:
 # 1️⃣  MAIN ENTRY – STRUCTURED KG & CYPHER GENERATION PROMPT  #
 ###############################################################
 
-def generate_structured_schema_and_cypher(text: str) -> dict:
+def generate_structured_schema_and_cypher(text: str, use_cache: bool = True) -> dict:
     """Given raw document text, produce a rich JSON spec and Cypher script.
 
     The prompt below is engineered to maximise **coverage** and **granularity**
     of the resulting knowledge‑graph while keeping the output machine‑parsable.
+    Results are cached on disk by document content, model and prompt version.
     """
-    prompt = f"""
+    cache = get_cache() if use_cache else None
+    key = cache_key(text, MODEL_NAME, PROMPT_VERSION)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    result = _extract_structured(text)
+    if cache is not None:
+        cache.put(key, result)
+    return result
+
+
+async def generate_structured_schema_and_cypher_async(text: str, use_cache: bool = True) -> dict:
+    """Async counterpart of :func:`generate_structured_schema_and_cypher`."""
+    cache = get_cache() if use_cache else None
+    key = cache_key(text, MODEL_NAME, PROMPT_VERSION)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    response = await _generate_json_async(_build_extraction_prompt(text))
+    result = _parse_model_json(response.text)
+    if cache is not None:
+        cache.put(key, result)
+    return result
+
+
+def stream_structured_schema_and_cypher(text: str, use_cache: bool = True
+                                        ) -> Iterator[Tuple[str, Any]]:
+    """Streaming variant of :func:`generate_structured_schema_and_cypher`.
+
+    Yields ``(key, element)`` for each element of the ``cypher`` / ``nodes``
+    / ``edges`` arrays as soon as the model has finished writing it, then
+    ``("result", full_dict)`` once the response is complete (and cached).
+    A cache hit replays the stored elements immediately.
+    """
+    cache = get_cache() if use_cache else None
+    key = cache_key(text, MODEL_NAME, PROMPT_VERSION)
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None:
+        for name in STREAMED_KEYS:
+            for item in cached.get(name) or []:
+                yield name, item
+        yield "result", cached
+        return
+
+    parser = ArrayElementStream(_WIRE_KEYS.get(name, name) for name in STREAMED_KEYS)
+    seen = {name: [] for name in STREAMED_KEYS}
+    for piece in _stream_json(_build_extraction_prompt(text)):
+        for name, item in parser.feed(piece):
+            name = _RESPONSE_KEYS.get(name, name)
+            item = _normalize_element(item)
+            seen[name].append(item)
+            yield name, item
+    try:
+        result = _parse_model_json(parser.text())
+    except ValueError as e:
+        # the elements already yielded were written; keep them rather than
+        # losing the response (but do not cache a partial result)
+        print(f"⚠️ {str(e).splitlines()[0]} – keeping {sum(map(len, seen.values()))} streamed elements")
+        yield "result", {"hierarchy": {}, "schema": {}, **seen}
+        return
+    if cache is not None:
+        cache.put(key, result)
+    yield "result", result
+
+
+def stream_structured_schema_and_cypher_chunked(
+    paragraphs: List[str],
+    max_tokens: int = int(os.getenv("GEMINI_CHUNK_TOKENS", "6000")),
+    overlap_tokens: int = int(os.getenv("GEMINI_CHUNK_OVERLAP", "400")),
+) -> Iterator[Iterator[Tuple[str, Any]]]:
+    """One event stream (see :func:`stream_structured_schema_and_cypher`)
+    per chunk, generated lazily one after another."""
+    for chunk in chunk_paragraphs(paragraphs, max_tokens, overlap_tokens):
+        yield stream_structured_schema_and_cypher(chunk)
+
+
+def _extract_structured(text: str) -> dict:
+    """Uncached model call behind :func:`generate_structured_schema_and_cypher`."""
+    response = _generate_json(_build_extraction_prompt(text))
+    return _parse_model_json(response.text)
+
+
+def _build_extraction_prompt(text: str) -> str:
+    return f"""
     You are an expert **knowledge‑graph architect** and **triple extractor**.
     Your goal is to convert the following document into a *dense* and *coherent*
     knowledge graph, surfacing as many meaningful **entities** (nodes) and
@@ -55,18 +467,23 @@ def generate_structured_schema_and_cypher(text: str) -> dict:
 
     **Mandatory:** Ensure **all relationships** are set in the Graph Database Schema, as visible with the `call db.schema.visualization()` command.
 
-    Return **one** valid JSON object with **exactly** these keys:
+    Return **one** valid JSON object with **exactly** these keys, in this order:
 
-    1.  \"hierarchy\"  – a recursive outline capturing topical structure.
-    2.  \"schema\" – describes the graph model.
-    3.  \"cypher\" – **array** of Cypher statements.
+    1.  \"nodes\" – **array** of `{{"id", "label", "properties": [{{"key", "value"}}]}}`;
+        `id` is a short local reference and every node has a `name` property.
+    2.  \"relationships\" – **array** of `{{"source", "target", "type", "properties": [{{"key", "value"}}]}}`
+        whose `source`/`target` are node ids.
+    3.  \"schema\" – the graph model: `{{"nodes": [{{"label", "properties": [names]}}],
+        "relationships": [{{"type", "from", "to"}}]}}`.
+    4.  \"sections\" – the topical outline, as an array of sections
+        `{{"title", "level", "summary"}}` (level 1 = top).
 
     --- 
 
     ## Extraction guidelines
     • Create **separate nodes** for distinct real‑world entities: persons, orgs, locations, events, concepts, dates, numerical facts, URLs, etc.  
     • **Identify and extract ALL relationships** among the nodes, whether **explicit** or **implicit**.
-    • **Mandatory balance** – The graph must contain at least ⌈nodes ÷ 2⌉ relationship statements.
+    • **Mandatory balance** – The graph must contain at least ⌈nodes ÷ 2⌉ edges.
     • Relationships **must** be emitted even if they're inferred or subtle (use `NO_RELATIONSHIP` for placeholders).
 
     Document Text ↓↓↓
@@ -74,10 +491,8 @@ def generate_structured_schema_and_cypher(text: str) -> dict:
     """
 
 
-
-    # === Call the model ===
-    response = model.generate_content(prompt)
-    payload = response.text.strip()
+def _parse_model_json(payload: str) -> dict:
+    payload = payload.strip()
 
     # ── Strip possible ``` fences ──────────────────────────────
     if payload.startswith("```"):
@@ -90,13 +505,57 @@ def generate_structured_schema_and_cypher(text: str) -> dict:
 
     # ── Parse the JSON or fall back to best‑effort extraction ──
     try:
-        return json.loads(payload)
+        result = json.loads(payload)
     except JSONDecodeError:
         snippet = extract_json(payload)
         try:
-            return json.loads(snippet)
+            result = json.loads(snippet)
         except JSONDecodeError:
             raise ValueError(f"Invalid JSON received from model:\n{payload}")
+    if isinstance(result, dict):
+        result = {_RESPONSE_KEYS.get(k, k): v for k, v in result.items()}
+    for key in ("nodes", "edges"):
+        if isinstance(result, dict) and isinstance(result.get(key), list):
+            result[key] = [_normalize_element(item) for item in result[key]]
+    return result
+
+
+def generate_structured_schema_and_cypher_chunked(
+    paragraphs: List[str],
+    max_tokens: int = int(os.getenv("GEMINI_CHUNK_TOKENS", "6000")),
+    overlap_tokens: int = int(os.getenv("GEMINI_CHUNK_OVERLAP", "400")),
+    workers: int = int(os.getenv("GEMINI_CHUNK_WORKERS", "4")),
+) -> dict:
+    """Map‑reduce variant for documents larger than one prompt.
+
+    *paragraphs* (as returned by ``extract_text_from_file``) are packed into
+    overlapping token‑budgeted windows, each window is extracted (and cached)
+    independently in parallel, and the results are merged with entity
+    deduplication across chunks.
+    """
+    chunks = chunk_paragraphs(paragraphs, max_tokens, overlap_tokens)
+    if not chunks:
+        return empty_result()
+    if len(chunks) == 1 or workers <= 1:
+        results = [generate_structured_schema_and_cypher(c) for c in chunks]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(generate_structured_schema_and_cypher, chunks))
+    return merge_results(results)
+
+
+async def generate_structured_schema_and_cypher_chunked_async(
+    paragraphs: List[str],
+    max_tokens: int = int(os.getenv("GEMINI_CHUNK_TOKENS", "6000")),
+    overlap_tokens: int = int(os.getenv("GEMINI_CHUNK_OVERLAP", "400")),
+) -> dict:
+    """Async map‑reduce extraction; chunks share the global concurrency and
+    rate limits, so many documents can be in flight at once."""
+    chunks = chunk_paragraphs(paragraphs, max_tokens, overlap_tokens)
+    if not chunks:
+        return empty_result()
+    results = await asyncio.gather(*(generate_structured_schema_and_cypher_async(c) for c in chunks))
+    return merge_results(list(results))
 
 
 #################################################
@@ -121,7 +580,7 @@ Schema:
 
 Risposta:
 """
-    response = model.generate_content(prompt)
+    response = generate_content(prompt)
     narrative = response.text.strip()
     if narrative.startswith("```") and narrative.endswith("```"):
         narrative = narrative.strip("```").strip()
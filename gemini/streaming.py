@@ -0,0 +1,109 @@
+# gemini/streaming.py
+"""Incremental JSON parsing of a streamed model response.
+
+:class:`ArrayElementStream` is fed the response text chunk by chunk and
+returns every element of the watched top‑level arrays (``cypher``,
+``nodes``, ``edges``) as soon as its closing character has arrived, so the
+caller can act on the first statements while the model is still writing
+the rest.  Each character is scanned exactly once; only the text of the
+element being completed is buffered for ``json.loads``, and the full text
+is kept for the final whole‑object parse.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Iterable, List, Optional, Tuple
+
+STREAMED_KEYS = ("cypher", "nodes", "edges")
+
+
+class ArrayElementStream:
+    """Push parser emitting ``(key, element)`` for watched top‑level arrays."""
+
+    def __init__(self, keys: Iterable[str] = STREAMED_KEYS):
+        self.keys = frozenset(keys)
+        self._chunks: List[str] = []
+        self._depth = 0            # nesting depth, 1 = inside the top object
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._string_parts: List[str] = []
+        self._last_string: Optional[str] = None  # key candidate at depth 1
+        self._array: Optional[str] = None        # watched array being read
+        self._elem_parts: Optional[List[str]] = None
+        self._elem_start = 0
+        self._elem_is_scalar = False
+
+    # ── public API ────────────────────────────────────────────
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self._chunks.append(chunk)
+        out: List[Tuple[str, Any]] = []
+        if self._elem_parts is not None:
+            self._elem_start = 0
+        if self._in_string:
+            self._string_start = 0
+        for i, ch in enumerate(chunk):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._string_parts.append(chunk[self._string_start:i])
+                        self._last_string = "".join(self._string_parts)
+                    if self._array is not None and self._depth == 2:
+                        self._emit(chunk, i + 1, out)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._string_start, self._string_parts = i + 1, []
+                if self._array is not None and self._depth == 2 and self._elem_parts is None:
+                    self._begin(i, scalar=False)
+            elif ch in "{[":
+                if self._array is not None and self._depth == 2 and self._elem_parts is None:
+                    self._begin(i, scalar=False)
+                if ch == "[" and self._depth == 1 and self._last_string in self.keys:
+                    self._array = self._last_string
+                self._depth += 1
+            elif ch in "}]":
+                if self._array is not None and self._depth == 2 and self._elem_is_scalar:
+                    self._emit(chunk, i, out)
+                self._depth -= 1
+                if self._depth == 1:
+                    self._array = None
+                elif self._array is not None and self._depth == 2 and self._elem_parts is not None:
+                    self._emit(chunk, i + 1, out)
+            elif ch == ",":
+                if self._array is not None and self._depth == 2 and self._elem_is_scalar:
+                    self._emit(chunk, i, out)
+            elif not ch.isspace() and ch != ":":
+                if self._array is not None and self._depth == 2 and self._elem_parts is None:
+                    self._begin(i, scalar=True)
+
+        # carry partial element / key text over to the next chunk
+        if self._elem_parts is not None:
+            self._elem_parts.append(chunk[self._elem_start:])
+        if self._in_string and self._depth == 1:
+            self._string_parts.append(chunk[self._string_start:])
+        return out
+
+    def text(self) -> str:
+        """Everything fed so far."""
+        return "".join(self._chunks)
+
+    # ── internals ─────────────────────────────────────────────
+    def _begin(self, i: int, scalar: bool) -> None:
+        self._elem_parts, self._elem_start, self._elem_is_scalar = [], i, scalar
+
+    def _emit(self, chunk: str, end: int, out: List[Tuple[str, Any]]) -> None:
+        raw = "".join(self._elem_parts) + chunk[self._elem_start:end]
+        self._elem_parts, self._elem_is_scalar = None, False
+        try:
+            out.append((self._array, json.loads(raw)))
+        except json.JSONDecodeError:
+            pass  # malformed element: the final whole‑object parse decides
@@ -0,0 +1,213 @@
+# graphdb/batch_writer.py
+"""Batched, parameterised Neo4j writes.
+
+Nodes and relationships are grouped by shape (labels / type and the set of
+MERGE keys) so each group becomes a single ``UNWIND $rows AS row MERGE …``
+query, executed in explicit write transactions of ``batch_size`` rows.
+``session.execute_write`` retries transient errors (deadlocks, leader
+switches, …) with backoff, so a batch is either fully applied or retried;
+a batch hitting a constraint violation is bisected so only its offending
+rows are lost, while a statement‑level error fails the batch once.
+
+When a *source* document is given, every written node and relationship
+records it in a ``_sources`` list property.  :func:`retract_graph` removes
+a source from those lists and deletes what no other document still backs,
+which is how a changed document's stale subgraph is replaced.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+from graphdb.graph_ir import GraphIR
+
+
+def _q(name: str) -> str:
+    """Backtick‑quote a label, type or property key."""
+    return "`" + name.replace("`", "``") + "`"
+
+
+def _key_map(keys: Iterable[str], source: str) -> str:
+    return "{" + ", ".join(f"{_q(k)}: {source}.{_q(k)}" for k in keys) + "}"
+
+
+def _labels(labels: Iterable[str]) -> str:
+    return "".join(":" + _q(l) for l in labels)
+
+
+def _chunks(rows: List[dict], size: int) -> Iterable[List[dict]]:
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def _add_source(var: str) -> str:
+    return (f", {var}._sources = CASE WHEN $source IN coalesce({var}._sources, []) "
+            f"THEN {var}._sources ELSE coalesce({var}._sources, []) + $source END")
+
+
+def _write_rows(session, query: str, rows: List[dict], stats: dict, **params) -> None:
+    """Write *rows* in one transaction; if a row violates a constraint, bisect
+    the batch so only the offending rows are lost (O(log n) extra
+    transactions per bad row).  Other errors are not tied to particular rows
+    (every row would hit them alike) and are raised to the caller."""
+    from neo4j import exceptions  # the driver is loaded by now; keeps this module light
+
+    try:
+        session.execute_write(lambda tx: tx.run(query, rows=rows, **params).consume())
+        stats["rows"] += len(rows)
+        stats["transactions"] += 1
+    except exceptions.ConstraintError as e:
+        if len(rows) == 1:
+            stats["failed_rows"] += 1
+            print(f"⚠️ Neo4j row error:\n{query}\nrow={rows[0]}\n→ {e.message}\n")
+            return
+        mid = len(rows) // 2
+        _write_rows(session, query, rows[:mid], stats, **params)
+        _write_rows(session, query, rows[mid:], stats, **params)
+
+
+def _run_batches(session, query: str, rows: List[dict], batch_size: int, stats: dict,
+                 **params) -> None:
+    from neo4j import exceptions
+
+    for start, chunk in enumerate(_chunks(rows, batch_size)):
+        done = stats["rows"] + stats["failed_rows"]
+        try:
+            _write_rows(session, query, chunk, stats, **params)
+        except exceptions.Neo4jError as e:
+            # a broken statement fails every later batch too; other errors
+            # (database, exhausted retries) cost only this batch
+            syntax = isinstance(e, exceptions.CypherSyntaxError)
+            left = (len(rows) - start * batch_size if syntax else len(chunk)) \
+                - (stats["rows"] + stats["failed_rows"] - done)
+            stats["failed_rows"] += left
+            print(f"⚠️ Neo4j batch error ({left} rows):\n{query}\n→ {e.message}\n")
+            if syntax:
+                return
+
+
+def _node_groups(graph: GraphIR) -> Dict[Tuple, List[dict]]:
+    groups: Dict[Tuple, List[dict]] = defaultdict(list)
+    for node in graph.nodes.values():
+        groups[(node.labels, tuple(k for k, _ in node.merge))].append(
+            {"m": node.merge_props, "s": node.props}
+        )
+    return groups
+
+
+def _edge_groups(graph: GraphIR) -> Dict[Tuple, List[dict]]:
+    groups: Dict[Tuple, List[dict]] = defaultdict(list)
+    for edge in graph.edges.values():
+        (a_labels, a_items), (b_labels, b_items) = edge.start, edge.end
+        shape = (a_labels, tuple(k for k, _ in a_items), edge.type,
+                 tuple(k for k, _ in edge.merge), b_labels, tuple(k for k, _ in b_items))
+        groups[shape].append({"a": dict(a_items), "b": dict(b_items),
+                              "m": edge.merge_props, "s": edge.props})
+    return groups
+
+
+def _edge_pattern(shape: Tuple, verb: str) -> str:
+    a_labels, a_keys, rtype, r_keys, b_labels, b_keys = shape
+    r_props = " " + _key_map(r_keys, "row.m") if r_keys else ""
+    return (
+        f"MATCH (a{_labels(a_labels)} {_key_map(a_keys, 'row.a')}) "
+        f"MATCH (b{_labels(b_labels)} {_key_map(b_keys, 'row.b')}) "
+        f"{verb} (a)-[r:{_q(rtype)}{r_props}]->(b)"
+    )
+
+
+def node_batches(graph: GraphIR, with_source: bool = False) -> Dict[str, List[dict]]:
+    """Group IR nodes into one UNWIND query per (labels, merge keys) shape."""
+    extra = _add_source("n") if with_source else ""
+    return {
+        f"UNWIND $rows AS row MERGE (n{_labels(labels)} {_key_map(keys, 'row.m')}) SET n += row.s{extra}": rows
+        for (labels, keys), rows in _node_groups(graph).items()
+    }
+
+
+def edge_batches(graph: GraphIR, with_source: bool = False) -> Dict[str, List[dict]]:
+    """Group IR edges by (start shape, type, merge keys, end shape)."""
+    extra = _add_source("r") if with_source else ""
+    return {
+        "UNWIND $rows AS row " + _edge_pattern(shape, "MERGE") + f" SET r += row.s{extra}": rows
+        for shape, rows in _edge_groups(graph).items()
+    }
+
+
+def retract_graph(driver, stale: GraphIR, source: str, database: str | None = None) -> None:
+    """Remove *source* from the ``_sources`` of every record in *stale* and
+    delete those left without any source, all in one write transaction.
+    Records written before provenance tracking (no ``_sources``) are kept."""
+    drop = ("SET {v}._sources = [s IN {v}._sources WHERE s <> $source] "
+            "WITH {v} WHERE size({v}._sources) = 0 ")
+    queries = []
+    for shape, rows in _edge_groups(stale).items():
+        queries.append((
+            "UNWIND $rows AS row " + _edge_pattern(shape, "MATCH")
+            + " WHERE r._sources IS NOT NULL " + drop.format(v="r") + "DELETE r",
+            rows,
+        ))
+    for (labels, keys), rows in _node_groups(stale).items():
+        queries.append((
+            f"UNWIND $rows AS row MATCH (n{_labels(labels)} {_key_map(keys, 'row.m')}) "
+            "WHERE n._sources IS NOT NULL " + drop.format(v="n") + "DETACH DELETE n",
+            rows,
+        ))
+    if not queries:
+        return
+
+    def work(tx):
+        for query, rows in queries:
+            tx.run(query, rows=rows, source=source).consume()
+
+    with driver.session(database=database) as session:
+        session.execute_write(work)
+
+
+def run_raw_statements(session, statements: List[str], batch_size: int, stats: dict) -> None:
+    """Run unparsed statements *batch_size* at a time in one transaction;
+    if a batch fails, replay it statement by statement so one bad line does
+    not discard its neighbours."""
+    from neo4j import exceptions
+
+    for chunk in _chunks(statements, batch_size):
+        def work(tx):
+            for stmt in chunk:
+                tx.run(stmt).consume()
+        try:
+            session.execute_write(work)
+            stats["statements"] += len(chunk)
+            stats["transactions"] += 1
+            continue
+        except exceptions.Neo4jError:
+            pass
+        for stmt in chunk:
+            try:
+                session.execute_write(lambda tx: tx.run(stmt).consume())
+                stats["statements"] += 1
+                stats["transactions"] += 1
+            except exceptions.CypherSyntaxError as e:
+                stats["failed_statements"] += 1
+                print(f"⚠️ Cypher syntax error:\n{stmt}\n→ {e.message}\n")
+            except exceptions.Neo4jError as e:
+                stats["failed_statements"] += 1
+                print(f"⚠️ Neo4j error:\n{stmt}\n→ {e.message}\n")
+
+
+def write_graph(driver, graph: GraphIR, batch_size: int = 1000,
+                database: str | None = None, source: str | None = None) -> dict:
+    """Validate *graph*, then write nodes, edges and leftover raw statements.
+    With *source*, records are tagged with the document they came from."""
+    for problem in graph.validate():
+        print(f"⚠️ Skipping {problem}")
+    stats = {"rows": 0, "statements": 0, "transactions": 0,
+             "failed_rows": 0, "failed_statements": 0}
+    with driver.session(database=database) as session:
+        params = {"source": source} if source else {}
+        for query, rows in node_batches(graph, bool(source)).items():
+            _run_batches(session, query, rows, batch_size, stats, **params)
+        for query, rows in edge_batches(graph, bool(source)).items():
+            _run_batches(session, query, rows, batch_size, stats, **params)
+        run_raw_statements(session, graph.raw, batch_size, stats)
+    return stats
@@ -0,0 +1,227 @@
+# graphdb/bulk_export.py
+"""Offline bulk‑load export in the ``neo4j-admin database import`` format.
+
+Graphs from many documents are streamed into header + data CSV pairs, one
+pair per node *shape* (labels plus typed property columns) and per
+relationship shape.  Rows are written as they arrive, and node/relationship
+identity is deduplicated through a small on‑disk SQLite set, so memory stays
+bounded however large the backfill is.  At most ``MAX_OPEN_FILES`` data
+files are open at once (least recently written ones are closed and later
+reopened for appending), so free‑form model properties producing thousands
+of shapes cannot exhaust file descriptors.  ``close()`` writes the headers and
+an ``import_command.txt`` with the matching ``neo4j-admin`` invocation.
+
+Node IDs are a stable hash of the IR node key (labels + merge properties),
+so the same entity extracted from different documents gets the same ID
+(the properties of its first occurrence are the ones exported).  The ID
+column is unnamed (``:ID``), so it only links relationships and is not
+stored as a node property.
+
+Every record also gets the ``_sources`` list the transactional writer
+maintains (see ``graphdb.batch_writer``): the documents it was extracted
+from are collected in the on‑disk set while exporting, and ``close()``
+appends them as a ``_sources:string[]`` column in one sequential pass over
+each data file, so a record shared by several documents lists all of them.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import os
+import sqlite3
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from graphdb.graph_ir import GraphIR, stable_id
+
+ARRAY_DELIMITER = ";"
+# Data files kept open at once; the rest are reopened on demand
+MAX_OPEN_FILES = int(os.getenv("BULK_EXPORT_MAX_OPEN_FILES", 256))
+
+
+def _csv_type(value: Any) -> str:
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "long"
+    if isinstance(value, float):
+        return "double"
+    if isinstance(value, (list, tuple)):
+        inner = {_csv_type(v) for v in value}
+        return (inner.pop() if len(inner) == 1 else "string") + "[]"
+    return "string"
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, tuple)):
+        return ARRAY_DELIMITER.join(_cell(v) for v in value)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+class _ShapeFile:
+    __slots__ = ("path", "header", "fh", "writer", "rows")
+
+    def __init__(self, path: Path, header: List[str]):
+        self.path = path
+        self.header = header
+        self.fh = None
+        self.writer = None
+        self.rows = 0
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+    def open(self) -> None:
+        # truncate on first open, append after being closed for the handle cap
+        self.fh = open(self.path, "a" if self.rows else "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.fh)
+
+    def close(self) -> None:
+        if self.fh is not None:
+            self.fh.close()
+            self.fh = self.writer = None
+
+
+class BulkExporter:
+    """Accumulate :class:`GraphIR` instances into neo4j‑admin import CSVs."""
+
+    def __init__(self, out_dir: str | Path):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self._nodes: Dict[Tuple, _ShapeFile] = {}
+        self._rels: Dict[Tuple, _ShapeFile] = {}
+        self._open: "OrderedDict[int, _ShapeFile]" = OrderedDict()
+        # a leftover set from a crashed run would skip everything as "seen"
+        seen_path = self.out_dir / ".seen.sqlite"
+        seen_path.unlink(missing_ok=True)
+        self._seen = sqlite3.connect(str(seen_path))
+        self._seen.execute("PRAGMA journal_mode=OFF")
+        self._seen.execute("PRAGMA synchronous=OFF")
+        self._seen.execute("CREATE TABLE IF NOT EXISTS seen "
+                           "(id TEXT PRIMARY KEY, sources TEXT NOT NULL) WITHOUT ROWID")
+        self.stats = {"nodes": 0, "relationships": 0, "duplicate_nodes": 0, "duplicate_relationships": 0}
+
+    def _first_time(self, ident: str, source: str | None) -> bool:
+        """Mark *ident* as exported; a repeat only adds *source* to its list."""
+        sources = json.dumps([source] if source else [], ensure_ascii=False)
+        cur = self._seen.execute("INSERT OR IGNORE INTO seen VALUES (?, ?)", (ident, sources))
+        if cur.rowcount == 1:
+            return True
+        if source:
+            self._seen.execute(
+                "UPDATE seen SET sources = json_insert(sources, '$[#]', ?) WHERE id = ? "
+                "AND NOT EXISTS (SELECT 1 FROM json_each(sources) WHERE value = ?)",
+                (source, ident, source),
+            )
+        return False
+
+    def _sources(self, ident: str) -> List[str]:
+        row = self._seen.execute("SELECT sources FROM seen WHERE id = ?", (ident,)).fetchone()
+        return json.loads(row[0]) if row else []
+
+    def _append_sources(self, sf: _ShapeFile, prefix: str, id_cells: int) -> None:
+        """Rewrite *sf* with the ``_sources`` column appended; the record ID is
+        read from its first cell, the first *id_cells* cells are then dropped."""
+        tmp = sf.path.with_suffix(".tmp")
+        with open(sf.path, newline="", encoding="utf-8") as src, \
+                open(tmp, "w", newline="", encoding="utf-8") as dst:
+            writer = csv.writer(dst)
+            for row in csv.reader(src):
+                writer.writerow(row[id_cells:] + [_cell(self._sources(prefix + row[0]))])
+        tmp.replace(sf.path)
+        sf.header = sf.header + ["_sources:string[]"]
+
+    @staticmethod
+    def _columns(props: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+        return tuple(sorted((k, _csv_type(v)) for k, v in props.items() if v is not None))
+
+    def _file(self, table: Dict[Tuple, _ShapeFile], prefix: str, shape: Tuple,
+              header: List[str]) -> _ShapeFile:
+        sf = table.get(shape)
+        if sf is None:
+            sf = table[shape] = _ShapeFile(self.out_dir / f"{prefix}_{len(table):04d}.csv", header)
+        if sf.fh is None:
+            if len(self._open) >= MAX_OPEN_FILES:
+                self._open.popitem(last=False)[1].close()
+            sf.open()
+            self._open[id(sf)] = sf
+        else:
+            self._open.move_to_end(id(sf))
+        return sf
+
+    def add_graph(self, graph: GraphIR, source: str | None = None) -> None:
+        """Stream the nodes and edges of one document's graph to disk,
+        recording *source* (see ``graphdb.manifest.source_id``) as their origin."""
+        for problem in graph.validate():
+            print(f"⚠️ Skipping {problem}")
+        for key, node in graph.nodes.items():
+            nid = stable_id(key)
+            if not self._first_time("n" + nid, source):
+                self.stats["duplicate_nodes"] += 1
+                continue
+            props = {**node.props, **node.merge_props}
+            cols = self._columns(props)
+            header = [":ID"] + [f"{k}:{t}" for k, t in cols] + [":LABEL"]
+            sf = self._file(self._nodes, "nodes", (node.labels, cols), header)
+            sf.writer.writerow([nid] + [_cell(props[k]) for k, _ in cols] + [";".join(node.labels)])
+            sf.rows += 1
+            self.stats["nodes"] += 1
+
+        for key, edge in graph.edges.items():
+            rid = stable_id(key)
+            if not self._first_time("r" + rid, source):
+                self.stats["duplicate_relationships"] += 1
+                continue
+            props = {**edge.props, **edge.merge_props}
+            cols = self._columns(props)
+            header = [":START_ID"] + [f"{k}:{t}" for k, t in cols] + [":END_ID", ":TYPE"]
+            sf = self._file(self._rels, "relationships", (edge.type, cols), header)
+            # leading relationship ID is only kept to look up _sources in close()
+            sf.writer.writerow([rid, stable_id(edge.start)] + [_cell(props[k]) for k, _ in cols]
+                               + [stable_id(edge.end), edge.type])
+            sf.rows += 1
+            self.stats["relationships"] += 1
+        self._seen.commit()
+        for raw in graph.raw:
+            print(f"⚠️ Raw Cypher cannot be bulk‑exported, skipped:\n{raw}\n")
+
+    def close(self, database: str = "neo4j") -> Path:
+        """Flush data files, add the ``_sources`` column, write headers and
+        the import command; return its path."""
+        args: List[str] = []
+        for flag, table, prefix, id_cells in (("--nodes", self._nodes, "n", 0),
+                                              ("--relationships", self._rels, "r", 1)):
+            for sf in table.values():
+                sf.close()
+                self._append_sources(sf, prefix, id_cells)
+                header_name = sf.name.replace(".csv", "_header.csv")
+                with open(self.out_dir / header_name, "w", newline="", encoding="utf-8") as fh:
+                    csv.writer(fh).writerow(sf.header)
+                args.append(f"{flag}={header_name},{sf.name}")
+        self._open.clear()
+        self._seen.close()
+        (self.out_dir / ".seen.sqlite").unlink(missing_ok=True)
+        cmd = self.out_dir / "import_command.txt"
+        cmd.write_text(
+            "neo4j-admin database import full "
+            f"--array-delimiter='{ARRAY_DELIMITER}' --multiline-fields=true "
+            "--skip-duplicate-nodes=true \\\n  "
+            + " \\\n  ".join(args) + f" \\\n  {database}\n",
+            encoding="utf-8",
+        )
+        return cmd
+
+    def __enter__(self) -> "BulkExporter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
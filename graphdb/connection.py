@@ -0,0 +1,170 @@
+# graphdb/connection.py
+"""One shared, tunable Neo4j connection pool per process.
+
+:class:`ConnectionManager` owns a single ``neo4j`` driver (created on first
+use) configured from :class:`PoolConfig`: pool size, connection acquisition
+timeout, max connection lifetime, keep‑alive, fetch size and the target
+database.  It is safe to share across threads — the driver's pool is — and
+it can be used wherever a driver is expected, since ``session()`` accepts
+the same arguments and fills in the configured database and fetch size.
+
+Sessions opened through the manager are counted, so ``metrics()`` reports
+how many are active, the peak concurrency and how long they were held;
+compare ``peak_active`` with ``max_connection_pool_size`` to size the pool.
+Use it as a context manager, or call ``close()``, to shut the pool down;
+the process‑wide instance from :func:`get_connection` is closed at exit.
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+_env_path = Path(__file__).resolve().parents[1] / ".env"
+_env_loaded = False
+
+
+def load_env() -> None:
+    """Load the project‑root .env once (overriding the process environment)."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        print(f"[DEBUG] Loading .env from {_env_path}")
+        load_dotenv(_env_path, override=True)
+        _env_loaded = True
+
+
+class PoolConfig(NamedTuple):
+    """Connection and pool settings (durations in seconds)."""
+    uri: str = "bolt://localhost:7687"
+    user: str = "neo4j"
+    password: str = "password"
+    database: Optional[str] = None          # None → server default database
+    max_connection_pool_size: int = 100
+    connection_acquisition_timeout: float = 60.0
+    max_connection_lifetime: float = 3600.0
+    keep_alive: bool = True
+    fetch_size: int = 1000                  # records pulled per batch
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        load_env()
+        d = cls()
+        return cls(
+            uri=os.getenv("NEO4J_URI", d.uri),
+            user=os.getenv("NEO4J_USER", d.user),
+            password=os.getenv("NEO4J_PASSWORD", d.password),
+            database=os.getenv("NEO4J_DB") or d.database,
+            max_connection_pool_size=int(os.getenv("NEO4J_POOL_SIZE", d.max_connection_pool_size)),
+            connection_acquisition_timeout=float(
+                os.getenv("NEO4J_ACQUISITION_TIMEOUT_S", d.connection_acquisition_timeout)),
+            max_connection_lifetime=float(
+                os.getenv("NEO4J_MAX_CONNECTION_LIFETIME_S", d.max_connection_lifetime)),
+            keep_alive=os.getenv("NEO4J_KEEP_ALIVE", "1") == "1",
+            fetch_size=int(os.getenv("NEO4J_FETCH_SIZE", d.fetch_size)),
+        )
+
+
+class ConnectionManager:
+    """Lazily created, shared Neo4j driver with session accounting."""
+
+    def __init__(self, config: Optional[PoolConfig] = None):
+        self.config = config or PoolConfig.from_env()
+        self._driver = None
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._active = 0
+        self._peak = 0
+        self._held_s = 0.0
+
+    @property
+    def driver(self):
+        if self._driver is None:
+            with self._lock:
+                if self._driver is None:
+                    from neo4j import GraphDatabase
+                    cfg = self.config
+                    print(f"[DEBUG] Neo4j → URI={cfg.uri!r}, USER={cfg.user!r}, "
+                          f"PASS_LOADED={bool(cfg.password)}, pool={cfg.max_connection_pool_size}")
+                    self._driver = GraphDatabase.driver(
+                        cfg.uri,
+                        auth=(cfg.user, cfg.password),
+                        max_connection_pool_size=cfg.max_connection_pool_size,
+                        connection_acquisition_timeout=cfg.connection_acquisition_timeout,
+                        max_connection_lifetime=cfg.max_connection_lifetime,
+                        keep_alive=cfg.keep_alive,
+                        fetch_size=cfg.fetch_size,
+                    )
+        return self._driver
+
+    @contextmanager
+    def session(self, database: Optional[str] = None, **kwargs) -> Iterator:
+        """``driver.session()`` defaulting to the configured database and fetch size."""
+        kwargs.setdefault("fetch_size", self.config.fetch_size)
+        driver = self.driver
+        with self._lock:
+            self._opened += 1
+            self._active += 1
+            self._peak = max(self._peak, self._active)
+        t0 = time.perf_counter()
+        try:
+            with driver.session(database=database or self.config.database, **kwargs) as session:
+                yield session
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._held_s += time.perf_counter() - t0
+
+    def metrics(self) -> dict:
+        """Session counts and pool settings, for sizing the pool."""
+        with self._lock:
+            return {
+                "sessions_opened": self._opened,
+                "sessions_active": self._active,
+                "peak_active": self._peak,
+                "session_time_s": round(self._held_s, 3),
+                "max_pool_size": self.config.max_connection_pool_size,
+                "connected": self._driver is not None,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            driver, self._driver = self._driver, None
+        if driver is not None:
+            driver.close()
+
+    def __enter__(self) -> "ConnectionManager":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+_connection: Optional[ConnectionManager] = None
+_connection_lock = threading.Lock()
+
+
+def get_connection() -> ConnectionManager:
+    """Process‑wide connection manager, configured from the environment."""
+    global _connection
+    if _connection is None:
+        with _connection_lock:
+            if _connection is None:
+                _connection = ConnectionManager()
+                atexit.register(_connection.close)
+    return _connection
+
+
+def close_connection() -> None:
+    """Close the process‑wide pool (a later get_connection() reopens it)."""
+    global _connection
+    with _connection_lock:
+        conn, _connection = _connection, None
+    if conn is not None:
+        atexit.unregister(conn.close)
+        conn.close()
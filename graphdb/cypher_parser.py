@@ -0,0 +1,311 @@
+# graphdb/cypher_parser.py
+"""Lower Gemini‑generated MERGE/CREATE statements into the graph IR
+(:mod:`graphdb.graph_ir`) so they can be deduplicated and batch‑written.
+
+Only the simple pattern shapes the model actually emits are understood:
+
+    MERGE (p:Person {name: 'Ada'}) SET p.born = 1815
+    MATCH (a:Person {name: 'Ada'}), (b:Org {name: 'X'}) MERGE (a)-[:WORKS_AT]->(b)
+    MERGE (a:Person {name: 'Ada'})-[:KNOWS {since: 1833}]->(b:Person {name: 'Charles'})
+
+Anything else (WHERE clauses, functions, DELETE, …) is returned untouched in
+``GraphIR.raw`` so the caller can still run it verbatim.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from graphdb.graph_ir import Edge, GraphIR, Node
+
+_IDENT = r"(?:`[^`]+`|[A-Za-z_][A-Za-z0-9_]*)"
+_NODE_RE = re.compile(
+    r"\(\s*(?P<var>" + _IDENT + r")?\s*(?P<labels>(?::\s*" + _IDENT + r"\s*)*)"
+    r"(?P<props>\{(?:[^{}]|\{[^{}]*\})*\})?\s*\)"
+)
+_REL_RE = re.compile(
+    r"\s*(?P<left><)?-\[\s*(?P<var>" + _IDENT + r")?\s*:\s*(?P<type>" + _IDENT + r")\s*"
+    r"(?P<props>\{(?:[^{}]|\{[^{}]*\})*\})?\s*\]-(?P<right>>)?\s*"
+)
+_CLAUSE_RE = re.compile(r"^\s*(MERGE|CREATE|MATCH|SET|ON\s+CREATE\s+SET|ON\s+MATCH\s+SET)\b", re.I)
+_UNSUPPORTED_RE = re.compile(
+    r"\b(WHERE|DELETE|DETACH|REMOVE|WITH|RETURN|UNWIND|CALL|FOREACH|OPTIONAL|LOAD)\b", re.I
+)
+
+
+class CypherParseError(ValueError):
+    pass
+
+
+def _unquote(ident: str) -> str:
+    return ident[1:-1] if ident.startswith("`") else ident
+
+
+# ──────────────────────────────────────────────────────────────
+# Literal parser (maps, lists, strings, numbers, booleans, null)
+# ──────────────────────────────────────────────────────────────
+
+class _Literal:
+    def __init__(self, text: str, pos: int = 0):
+        self.s = text
+        self.i = pos
+
+    def ws(self) -> None:
+        while self.i < len(self.s) and self.s[self.i].isspace():
+            self.i += 1
+
+    def value(self) -> Any:
+        self.ws()
+        if self.i >= len(self.s):
+            raise CypherParseError("unexpected end of literal")
+        ch = self.s[self.i]
+        if ch in "'\"":
+            return self.string()
+        if ch == "{":
+            return self.map()
+        if ch == "[":
+            return self.list()
+        m = re.compile(r"-?\d+(\.\d+)?([eE][-+]?\d+)?").match(self.s, self.i)
+        if m:
+            self.i = m.end()
+            return float(m.group(0)) if (m.group(1) or m.group(2)) else int(m.group(0))
+        for word, val in (("true", True), ("false", False), ("null", None)):
+            if self.s[self.i:self.i + len(word)].lower() == word:
+                self.i += len(word)
+                return val
+        raise CypherParseError(f"unsupported literal at {self.s[self.i:self.i + 20]!r}")
+
+    def string(self) -> str:
+        quote = self.s[self.i]
+        self.i += 1
+        out = []
+        while self.i < len(self.s):
+            ch = self.s[self.i]
+            if ch == "\\" and self.i + 1 < len(self.s):
+                nxt = self.s[self.i + 1]
+                out.append({"n": "\n", "t": "\t"}.get(nxt, nxt))
+                self.i += 2
+                continue
+            if ch == quote:
+                self.i += 1
+                return "".join(out)
+            out.append(ch)
+            self.i += 1
+        raise CypherParseError("unterminated string")
+
+    def list(self) -> list:
+        self.i += 1
+        items = []
+        self.ws()
+        if self.s[self.i:self.i + 1] == "]":
+            self.i += 1
+            return items
+        while True:
+            items.append(self.value())
+            self.ws()
+            ch = self.s[self.i:self.i + 1]
+            self.i += 1
+            if ch == "]":
+                return items
+            if ch != ",":
+                raise CypherParseError("bad list literal")
+
+    def map(self) -> dict:
+        self.i += 1
+        out: Dict[str, Any] = {}
+        self.ws()
+        if self.s[self.i:self.i + 1] == "}":
+            self.i += 1
+            return out
+        while True:
+            self.ws()
+            m = re.compile(_IDENT).match(self.s, self.i)
+            if not m:
+                raise CypherParseError("bad map key")
+            self.i = m.end()
+            self.ws()
+            if self.s[self.i:self.i + 1] != ":":
+                raise CypherParseError("expected ':' in map")
+            self.i += 1
+            out[_unquote(m.group(0))] = self.value()
+            self.ws()
+            ch = self.s[self.i:self.i + 1]
+            self.i += 1
+            if ch == "}":
+                return out
+            if ch != ",":
+                raise CypherParseError("bad map literal")
+
+
+def parse_literal(text: str) -> Any:
+    lit = _Literal(text)
+    val = lit.value()
+    lit.ws()
+    if lit.i != len(text):
+        raise CypherParseError("trailing characters after literal")
+    return val
+
+
+# ──────────────────────────────────────────────────────────────
+# Statement parser
+# ──────────────────────────────────────────────────────────────
+
+_STRING_RE = re.compile(r"'(?:\\.|[^'\\])*'|\"(?:\\.|[^\"\\])*\"")
+_SET_CLAUSE_RE = re.compile(r"\b(?:ON\s+(?:CREATE|MATCH)\s+)?SET\b", re.I)
+_LEFTOVER_RE = re.compile(r"(?:\s|,|\bMERGE\b|\bCREATE\b|\bMATCH\b)*", re.I)
+
+
+def _mask_strings(text: str) -> str:
+    """Blank out string contents (keeping offsets) so patterns inside quoted
+    values cannot be mistaken for Cypher syntax."""
+    return _STRING_RE.sub(lambda m: m.group(0)[0] + "_" * (len(m.group(0)) - 2) + m.group(0)[-1], text)
+
+
+def _blank(text: str, start: int, end: int) -> str:
+    return text[:start] + " " * (end - start) + text[end:]
+
+
+def _parse_set_clause(body: str, masked: str, pos: int,
+                      assignments: List[Tuple[str, Optional[str], Any]]) -> int:
+    """Parse ``var.key = literal`` / ``var += {map}`` items; return end offset."""
+    ident = re.compile(_IDENT)
+    while True:
+        while pos < len(masked) and masked[pos].isspace():
+            pos += 1
+        m = ident.match(masked, pos)
+        if not m:
+            raise CypherParseError("bad SET item")
+        var = _unquote(m.group(0))
+        pos = m.end()
+        dot = re.compile(r"\s*\.\s*(" + _IDENT + r")\s*=").match(masked, pos)
+        plus = re.compile(r"\s*\+=").match(masked, pos)
+        if dot:
+            lit = _Literal(body, dot.end())
+            assignments.append((var, _unquote(dot.group(1)), lit.value()))
+        elif plus:
+            lit = _Literal(body, plus.end())
+            value = lit.value()
+            if not isinstance(value, dict):
+                raise CypherParseError("+= needs a map literal")
+            assignments.append((var, None, value))
+        else:
+            raise CypherParseError("unsupported SET item")
+        pos = lit.i
+        comma = re.compile(r"\s*,").match(masked, pos)
+        if not comma:
+            return pos
+        pos = comma.end()
+
+
+def _parse_statement(stmt: str, out: GraphIR) -> None:
+    body = stmt.strip().rstrip(";").strip()
+    masked = _mask_strings(body)
+    if not _CLAUSE_RE.match(masked) or _UNSUPPORTED_RE.search(masked):
+        raise CypherParseError("unsupported statement shape")
+
+    # 1) SET clauses – parsed first and blanked out of the pattern search
+    assignments: List[Tuple[str, Optional[str], Any]] = []
+    for m in list(_SET_CLAUSE_RE.finditer(masked)):
+        end = _parse_set_clause(body, masked, m.end(), assignments)
+        masked = _blank(masked, m.start(), end)
+
+    nodes: Dict[str, Node] = {}
+    anon: List[Node] = []
+    pending_rels = []
+
+    def props_at(m: re.Match) -> dict:
+        if m.group("props") is None:
+            return {}
+        return parse_literal(body[m.start("props"):m.end("props")])
+
+    def read_node(m: re.Match) -> Tuple[Optional[str], Optional[Node]]:
+        var = _unquote(m.group("var")) if m.group("var") else None
+        labels = tuple(_unquote(l.strip()) for l in m.group("labels").split(":")[1:])
+        props = props_at(m)
+        if labels:
+            row = Node(labels, props)
+            if var:
+                if var in nodes and nodes[var].key != row.key:
+                    raise CypherParseError("variable rebound")
+                nodes[var] = row
+            else:
+                anon.append(row)
+            return var, row
+        if props:
+            raise CypherParseError("properties on an unlabelled node")
+        return var, None
+
+    # 2) node patterns and -[:TYPE]-> chains
+    pos = 0
+    leftover = masked
+    while True:
+        m = _NODE_RE.search(masked, pos)
+        if not m:
+            break
+        left = read_node(m)
+        leftover = _blank(leftover, m.start(), m.end())
+        pos = m.end()
+        while True:
+            r = _REL_RE.match(masked, pos)
+            if not r:
+                break
+            n = _NODE_RE.match(masked, r.end())
+            if not n:
+                raise CypherParseError("relationship without end node")
+            right = read_node(n)
+            if (r.group("left") and r.group("right")) or not (r.group("left") or r.group("right")):
+                raise CypherParseError("undirected relationship")
+            a, b = (right, left) if r.group("left") else (left, right)
+            pending_rels.append((a, _unquote(r.group("type")), b, props_at(r),
+                                 _unquote(r.group("var")) if r.group("var") else None))
+            leftover = _blank(leftover, r.start(), n.end())
+            left = right
+            pos = n.end()
+
+    # 3) everything else must be clause keywords and commas
+    if not _LEFTOVER_RE.fullmatch(leftover):
+        raise CypherParseError("unparsed text in statement")
+
+    rel_vars: Dict[str, Dict[str, Any]] = {}
+    for var, key, value in assignments:
+        target = nodes[var].props if var in nodes else rel_vars.setdefault(var, {})
+        if key is None:
+            target.update(value)
+        else:
+            target[key] = value
+
+    known_rel_vars = {p[4] for p in pending_rels if p[4]}
+    if set(rel_vars) - known_rel_vars:
+        raise CypherParseError("SET on an unknown variable")
+
+    for row in list(nodes.values()) + anon:
+        out.add_node(row)
+
+    for (avar, arow), rtype, (bvar, brow), props, rvar in pending_rels:
+        arow = arow or nodes.get(avar)
+        brow = brow or nodes.get(bvar)
+        if arow is None or brow is None:
+            raise CypherParseError("relationship endpoint not bound to a labelled node")
+        out.add_edge(Edge(arow.key, rtype, brow.key, props, rel_vars.get(rvar, {}) if rvar else {}))
+
+
+def parse_cypher_statements(statements: List[str], into: Optional[GraphIR] = None) -> GraphIR:
+    """Parse model statements into deduplicated IR nodes and edges.
+
+    Statements are parsed independently (matching how they were executed
+    before); a statement that cannot be understood is kept verbatim in
+    ``raw``.  CREATE is treated like MERGE so re‑emitted entities collapse.
+    """
+    out = into if into is not None else GraphIR()
+    for stmt in statements:
+        if not stmt.strip():
+            continue
+        scratch = GraphIR()
+        try:
+            _parse_statement(stmt, scratch)
+        except CypherParseError:
+            out.raw.append(stmt.strip())
+            continue
+        out.extend(scratch)
+    return out
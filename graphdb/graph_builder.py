@@ -12,36 +12,57 @@ from __future__ import annotations
 
 import os
 import json
+import time
 from pathlib import Path
-from typing import List
+from typing import Any, Iterable, List, Optional, Tuple
 
-from dotenv import load_dotenv
-from neo4j import GraphDatabase, exceptions
 from preprocess.text_extractor import extract_text_from_file  # ✅ fixed import
+from graphdb.connection import ConnectionManager, get_connection, load_env
+from graphdb.cypher_parser import parse_cypher_statements
+from graphdb.batch_writer import retract_graph, write_graph
+from graphdb.graph_ir import GraphIR, add_model_element, graph_from_model_output
+from graphdb.schema_provisioning import ensure_indexes
+from graphdb.bulk_export import BulkExporter
+from graphdb.manifest import Manifest, file_hash, get_manifest, source_id
+from gemini.chunking import merge_results
 
 # ──────────────────────────────────────────────────────────────
 # Environment & connection
 # ──────────────────────────────────────────────────────────────
 
-# Locate and load the project‑root .env
-env_path = Path(__file__).resolve().parents[1] / ".env"
-print(f"[DEBUG] Loading .env from {env_path}")
-load_dotenv(env_path, override=True)
+# Nothing here runs at import time: the project‑root .env is loaded and the
+# pool opened by the first call to get_driver(), so processes that never
+# write (extraction workers, CLI --help) never open a connection.
 
-URI      = os.getenv("NEO4J_URI",      "bolt://localhost:7687")
-USER     = os.getenv("NEO4J_USER",     "neo4j")
-PASSWORD = os.getenv("NEO4J_PASSWORD", "password")
-print(f"[DEBUG] Neo4j → URI={URI!r}, USER={USER!r}, PASS_LOADED={bool(PASSWORD)}")
+def get_driver() -> ConnectionManager:
+    """Shared connection pool (see graphdb.connection); usable as a driver."""
+    return get_connection()
 
-driver = GraphDatabase.driver(URI, auth=(USER, PASSWORD))
+
+def _batch_size(batch_size: Optional[int]) -> int:
+    """Rows (or raw statements) per write transaction."""
+    if batch_size:
+        return batch_size
+    load_env()
+    return int(os.getenv("NEO4J_BATCH_SIZE", "1000"))
+
+
+def _unique_constraints() -> bool:
+    """Back single‑property node keys with uniqueness constraints instead of indexes."""
+    load_env()
+    return os.getenv("NEO4J_UNIQUE_CONSTRAINTS", "0") == "1"
 
 # ──────────────────────────────────────────────────────────────
 # Helper: execute Cypher
 # ──────────────────────────────────────────────────────────────
 
-def execute_cypher_queries(raw_script: str) -> None:
-    """Run every semicolon‑terminated statement in *raw_script* exactly as it
-    appears so that variables remain in scope.
+def execute_cypher_queries(raw_script: str, batch_size: Optional[int] = None) -> dict:
+    """Write every semicolon‑terminated statement in *raw_script* to Neo4j.
+
+    Simple MERGE/CREATE statements are parsed into node and relationship
+    rows and written as parameterised ``UNWIND`` batches in explicit
+    transactions; anything the parser does not understand is still run
+    exactly as it appears so that variables remain in scope.
     """
     # Ensure the script ends with a semicolon so the last statement is caught
     if not raw_script.strip().endswith(";"):
@@ -49,35 +70,174 @@ def execute_cypher_queries(raw_script: str) -> None:
 
     statements = [s.strip() + ";" for s in raw_script.split(";") if s.strip()]
 
-    with driver.session() as session:
-        for stmt in statements:
-            try:
-                session.run(stmt)
-            except exceptions.CypherSyntaxError as e:
-                print(f"⚠️ Cypher syntax error:\n{stmt}\n→ {e.message}\n")
-            except exceptions.Neo4jError as e:
-                print(f"⚠️ Neo4j error:\n{stmt}\n→ {e.message}\n")
+    return write_graph_ir(parse_cypher_statements(statements), batch_size)
+
+
+def write_graph_ir(graph: GraphIR, batch_size: Optional[int] = None,
+                   schema: dict | None = None, source: str | None = None) -> dict:
+    """Provision key indexes, then batch‑write an already parsed graph."""
+    driver = get_driver()
+    ensure_indexes(driver, graph, schema, unique=_unique_constraints())
+    stats = write_graph(driver, graph, _batch_size(batch_size), source=source)
+    print(
+        f"[DEBUG] Neo4j write → {len(graph.nodes)} nodes, {len(graph.edges)} edges, "
+        f"{len(graph.raw)} raw statements in {stats['transactions']} transactions"
+    )
+    return stats
+
+
+def write_model_output(result: dict, batch_size: Optional[int] = None) -> dict:
+    """Parse Gemini JSON (nodes/edges and/or cypher) into the IR and write it."""
+    return write_graph_ir(graph_from_model_output(result), batch_size, result.get("schema"))
+
+
+def replace_document_graph(path: str | Path, result: dict, content_hash: str,
+                           manifest: Manifest | None = None,
+                           batch_size: Optional[int] = None) -> dict:
+    """Incrementally (re)write one document's subgraph.
+
+    Whatever the previous version of *path* produced that the new version no
+    longer does is retracted in a single transaction, the new graph is
+    written tagged with the document, and the manifest is updated.
+    """
+    manifest = manifest or get_manifest()
+    source = source_id(path)
+    graph = graph_from_model_output(result)
+    for problem in graph.validate():
+        print(f"⚠️ Skipping {problem}")
+
+    _retract_stale(path, graph, manifest)
+    stats = write_graph_ir(graph, batch_size, result.get("schema"), source=source)
+    manifest.record(path, content_hash, graph)
+    return stats
+
+
+def _retract_stale(path: str | Path, graph: GraphIR, manifest: Manifest) -> None:
+    """Retract what the previous ingest of *path* wrote that *graph* no longer has."""
+    previous = manifest.previous_graph(path)
+    if previous is None:
+        return
+    source = source_id(path)
+    stale = GraphIR()
+    for key, node in previous.nodes.items():
+        if key not in graph.nodes:
+            stale.add_node(node)
+    for key, edge in previous.edges.items():
+        if key not in graph.edges:
+            stale.add_edge(edge)
+    retract_graph(get_driver(), stale, source)
+    print(f"[DEBUG] Retracted {len(stale.nodes)} stale nodes, {len(stale.edges)} stale edges of {source}")
+
+# ──────────────────────────────────────────────────────────────
+# Streaming: write elements while the model is still generating
+# ──────────────────────────────────────────────────────────────
+
+# A streamed batch is flushed after this many records or seconds
+STREAM_FLUSH_RECORDS = 200
+STREAM_FLUSH_S = 1.0
+
+
+def write_model_stream(events: Iterable[Tuple[str, Any]], batch_size: Optional[int] = None,
+                       source: str | None = None) -> Tuple[dict, GraphIR]:
+    """Write ``(key, element)`` events from
+    ``gemini_client.stream_structured_schema_and_cypher`` as they arrive.
+
+    Elements are buffered and flushed every ``STREAM_FLUSH_RECORDS`` records
+    or ``STREAM_FLUSH_S`` seconds, so the first write happens about a second
+    into generation.  An edge is flushed together with its endpoint nodes
+    (re‑MERGEd, which is idempotent); an edge streamed before its nodes is
+    held back until they arrive.  Returns the final model result and the
+    full graph of the response.
+    """
+    full, pending = GraphIR(), GraphIR()
+    by_id: dict = {}
+    waiting: dict = {}  # missing node id -> edges parked until it arrives
+    result: dict = {}
+    last_flush = time.monotonic()
+    writes = 0
+
+    def flush() -> None:
+        nonlocal pending, last_flush, writes
+        if pending.nodes or pending.edges or pending.raw:
+            write_graph_ir(pending, batch_size, source=source)
+            writes += 1
+        pending, last_flush = GraphIR(), time.monotonic()
+
+    for key, item in events:
+        if key == "result":
+            result = item
+            continue
+        element = GraphIR()
+        add_model_element(element, key, item, by_id, waiting)
+        for edge in element.edges.values():
+            for end in (edge.start, edge.end):
+                if end not in element.nodes and end in full.nodes:
+                    element.add_node(full.nodes[end])
+        full.extend(element)
+        pending.extend(element)
+        if (len(pending.nodes) + len(pending.edges) + len(pending.raw) >= STREAM_FLUSH_RECORDS
+                or time.monotonic() - last_flush >= STREAM_FLUSH_S):
+            flush()
+    flush()
+    orphans = sum(map(len, waiting.values()))
+    if orphans:
+        print(f"⚠️ Skipping {orphans} streamed edges whose endpoint nodes never arrived")
+    print(f"[DEBUG] Streamed {len(full.nodes)} nodes, {len(full.edges)} edges in {writes} writes")
+    return result, full
+
+
+def stream_document_graph(path: str | Path, paragraphs: List[str], content_hash: str,
+                          manifest: Manifest | None = None,
+                          batch_size: Optional[int] = None) -> dict:
+    """Streaming counterpart of :func:`replace_document_graph` that also runs
+    the extraction: each chunk's elements are written while it is being
+    generated, then stale records are retracted and the manifest updated.
+    Returns the merged model result."""
+    from gemini.gemini_client import stream_structured_schema_and_cypher_chunked  # late import (heavy SDK)
+
+    manifest = manifest or get_manifest()
+    source = source_id(path)
+    results, graph = [], GraphIR()
+    for events in stream_structured_schema_and_cypher_chunked(paragraphs):
+        result, chunk_graph = write_model_stream(events, batch_size, source)
+        results.append(result)
+        graph.extend(chunk_graph)
+    _retract_stale(path, graph, manifest)
+    manifest.record(path, content_hash, graph)
+    return merge_results(results)
 
 # ──────────────────────────────────────────────────────────────
 # Pipeline: PDF → text → Gemini → Cypher → Neo4j
 # ──────────────────────────────────────────────────────────────
 
-from gemini.gemini_client import generate_structured_schema_and_cypher  # late import to avoid heavy deps on load
+def build_graph_from_pdf(pdf_path: str | Path, force: bool = False,
+                         stream: bool = False) -> None:
+    """End‑to‑end ingestion of *pdf_path* into Neo4j.
 
-def build_graph_from_pdf(pdf_path: str | Path) -> None:
-    """End‑to‑end ingestion of *pdf_path* into Neo4j."""
+    Unchanged documents (per the ingest manifest) are skipped unless *force*.
+    With *stream*, chunks are generated one at a time and written while the
+    model is still responding instead of after the whole extraction.
+    """
     pdf_path = Path(pdf_path)
+    manifest = get_manifest()
+    changed, content_hash = manifest.check(pdf_path)
+    if not changed and not force:
+        print(f"[DEBUG] {pdf_path} unchanged since last ingest – skipped")
+        return
 
-    # 1️⃣ Extract raw document text (paragraph list ➜ string)
+    # 1️⃣ Extract raw document text (paragraph list)
     paragraphs: List[str] = extract_text_from_file(str(pdf_path))
-    doc_text = "\n".join(paragraphs)
 
-    # 2️⃣ Gemini: hierarchy, schema, cypher
-    result = generate_structured_schema_and_cypher(doc_text)
-    cypher_script = "\n".join(result.get("cypher", []))
+    # 2️⃣ Gemini: hierarchy, schema, nodes/edges (chunked map‑reduce)
+    if stream:
+        result = stream_document_graph(pdf_path, paragraphs, content_hash, manifest)
+    else:
+        from gemini.gemini_client import generate_structured_schema_and_cypher_chunked  # late import (heavy SDK)
+        result = generate_structured_schema_and_cypher_chunked(paragraphs)
 
-    # 3️⃣ Push to Neo4j
-    execute_cypher_queries(cypher_script)
+    # 3️⃣ Push to Neo4j (replacing this document's previous subgraph)
+    if not stream:  # the streaming path has already written it chunk by chunk
+        replace_document_graph(pdf_path, result, content_hash, manifest)
 
     # 4️⃣ Persist Gemini output for inspection (optional)
     out_dir = pdf_path.with_suffix("").parent / "outputs"
@@ -85,3 +245,21 @@ def build_graph_from_pdf(pdf_path: str | Path) -> None:
     (out_dir / f"{pdf_path.stem}_gemini.json").write_text(
         json.dumps(result, indent=2, ensure_ascii=False), encoding="utf‑8"
     )
+
+
+def export_pdfs_for_bulk_import(pdf_paths: Iterable[str | Path], out_dir: str | Path) -> Path:
+    """Backfill mode: extract many documents into neo4j‑admin import CSVs
+    instead of writing them transactionally, recording each one in the
+    ingest manifest.  Returns the path of the generated ``import_command.txt``."""
+    from gemini.gemini_client import generate_structured_schema_and_cypher_chunked  # late import (heavy SDK)
+
+    manifest = get_manifest()
+    with BulkExporter(out_dir) as exporter:
+        for pdf_path in pdf_paths:
+            paragraphs: List[str] = extract_text_from_file(str(pdf_path))
+            result = generate_structured_schema_and_cypher_chunked(paragraphs)
+            graph = graph_from_model_output(result)
+            exporter.add_graph(graph, source=source_id(pdf_path))
+            manifest.record(pdf_path, file_hash(pdf_path), graph)
+        print(f"[DEBUG] Bulk export → {exporter.stats}")
+    return Path(out_dir) / "import_command.txt"
@@ -0,0 +1,249 @@
+# graphdb/graph_ir.py
+"""Compact intermediate representation of an extracted knowledge graph.
+
+The Gemini JSON (``nodes`` / ``edges`` arrays, or legacy ``cypher``
+statements) is parsed once into :class:`GraphIR`; every writer — batched
+Neo4j MERGEs, bulk CSV export, manifests — consumes this structure instead
+of Cypher text.  Records use ``__slots__`` and labels, relationship types
+and property keys are interned, so graphs with many repeated labels stay
+small and compare by identity.
+
+A node is identified by its labels plus its *merge properties* (the
+properties a ``MERGE`` would match on); an edge by its endpoints, type and
+merge properties.  Adding the same node or edge twice merges the remaining
+properties into the existing record.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+NodeKey = Tuple[Tuple[str, ...], Tuple[Tuple[str, Any], ...]]
+EdgeKey = Tuple[NodeKey, str, NodeKey, Tuple[Tuple[str, Any], ...]]
+
+# Property tried, in order, as the identifying key of a JSON node
+KEY_PROPERTIES = ("name", "title", "id")
+
+_intern = sys.intern
+_PRIMITIVES = (str, int, float, bool)
+
+
+def stable_id(key: Any) -> str:
+    """64‑bit hex digest of a node or edge key, stable across processes."""
+    return hashlib.blake2b(repr(key).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _is_property(v: Any) -> bool:
+    """Whether Neo4j can store *v*: a primitive or a homogeneous list of them."""
+    if isinstance(v, (list, tuple)):
+        return all(isinstance(x, _PRIMITIVES) for x in v) and len({type(x) for x in v}) <= 1
+    return v is None or isinstance(v, _PRIMITIVES)
+
+
+def _to_property(v: Any) -> Any:
+    """Maps and nested/mixed lists become canonical JSON strings."""
+    return v if _is_property(v) else json.dumps(v, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def _freeze(v: Any) -> Any:
+    v = _to_property(v)
+    return tuple(v) if isinstance(v, list) else v
+
+
+def _merge_items(props: Dict[str, Any]) -> Tuple[Tuple[str, Any], ...]:
+    return tuple(sorted((_intern(str(k)), _freeze(v)) for k, v in props.items()))
+
+
+def _props(props: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {_intern(str(k)): v for k, v in (props or {}).items()}
+
+
+class Node:
+    __slots__ = ("labels", "merge", "props")
+
+    def __init__(self, labels: Iterable[str], merge: Dict[str, Any],
+                 props: Optional[Dict[str, Any]] = None):
+        self.labels: Tuple[str, ...] = tuple(_intern(l) for l in labels)
+        self.merge = _merge_items(merge)
+        self.props = _props(props)
+
+    @property
+    def key(self) -> NodeKey:
+        return self.labels, self.merge
+
+    @property
+    def merge_props(self) -> Dict[str, Any]:
+        return dict(self.merge)
+
+    def __repr__(self) -> str:
+        return f"Node({':'.join(self.labels)} {dict(self.merge)} +{self.props})"
+
+
+class Edge:
+    __slots__ = ("start", "type", "end", "merge", "props")
+
+    def __init__(self, start: NodeKey, rel_type: str, end: NodeKey,
+                 merge: Optional[Dict[str, Any]] = None,
+                 props: Optional[Dict[str, Any]] = None):
+        self.start = start
+        self.type = _intern(rel_type)
+        self.end = end
+        self.merge = _merge_items(merge or {})
+        self.props = _props(props)
+
+    @property
+    def key(self) -> EdgeKey:
+        return self.start, self.type, self.end, self.merge
+
+    @property
+    def merge_props(self) -> Dict[str, Any]:
+        return dict(self.merge)
+
+    def __repr__(self) -> str:
+        return f"Edge({self.start} -[:{self.type}]-> {self.end})"
+
+
+class GraphIR:
+    """Deduplicated node/edge set plus Cypher the parser could not lower."""
+
+    __slots__ = ("nodes", "edges", "raw")
+
+    def __init__(self) -> None:
+        self.nodes: Dict[NodeKey, Node] = {}
+        self.edges: Dict[EdgeKey, Edge] = {}
+        self.raw: List[str] = []
+
+    def add_node(self, node: Node) -> NodeKey:
+        existing = self.nodes.get(node.key)
+        if existing is None:
+            self.nodes[node.key] = node
+        else:
+            existing.props.update(node.props)
+        return node.key
+
+    def add_edge(self, edge: Edge) -> None:
+        existing = self.edges.get(edge.key)
+        if existing is None:
+            self.edges[edge.key] = edge
+        else:
+            existing.props.update(edge.props)
+
+    def extend(self, other: "GraphIR") -> None:
+        for node in other.nodes.values():
+            self.add_node(node)
+        for edge in other.edges.values():
+            self.add_edge(edge)
+        self.raw.extend(other.raw)
+
+    def validate(self) -> List[str]:
+        """Drop records Neo4j would reject and return a description of each.
+        Property values Neo4j cannot store (maps, nested lists) are kept as
+        JSON strings."""
+        problems = []
+        for record in (*self.nodes.values(), *self.edges.values()):
+            for k, v in record.props.items():
+                if not _is_property(v):
+                    record.props[k] = _to_property(v)
+        for key, node in list(self.nodes.items()):
+            if not node.labels or not all(node.labels):
+                problems.append(f"node without label: {node!r}")
+            elif not node.merge or any(v is None for _, v in node.merge):
+                problems.append(f"node with empty/null key: {node!r}")
+            else:
+                continue
+            del self.nodes[key]
+        for key, edge in list(self.edges.items()):
+            if edge.start not in self.nodes or edge.end not in self.nodes:
+                problems.append(f"edge with missing endpoint: {edge!r}")
+            elif not edge.type or any(v is None for _, v in edge.merge):
+                problems.append(f"edge with empty type/null key: {edge!r}")
+            else:
+                continue
+            del self.edges[key]
+        return problems
+
+    def __repr__(self) -> str:
+        return f"GraphIR({len(self.nodes)} nodes, {len(self.edges)} edges, {len(self.raw)} raw)"
+
+
+# ──────────────────────────────────────────────────────────────
+# Gemini JSON → IR
+# ──────────────────────────────────────────────────────────────
+
+def _json_node(item: dict) -> Optional[Node]:
+    labels = item.get("labels") or ([item["label"]] if item.get("label") else [])
+    if isinstance(labels, str):
+        labels = [labels]
+    props = dict(item.get("properties") or {})
+    for key in KEY_PROPERTIES:
+        if props.get(key) is not None:
+            merge = {key: props.pop(key)}
+            break
+    else:
+        if item.get("name") is not None:
+            merge = {"name": item["name"]}
+        elif props:
+            merge, props = props, {}
+        else:
+            return None
+    return Node(labels, merge, props)
+
+
+def graph_from_model_output(result: dict, into: Optional[GraphIR] = None) -> GraphIR:
+    """Build a :class:`GraphIR` from the model's JSON.
+
+    ``nodes`` are ``{"id", "label", "properties"}`` objects and ``edges``
+    ``{"source", "target", "type", "properties"}`` objects referring to node
+    ids; the ``id`` is only a local reference inside one response.  Any
+    legacy ``cypher`` statements are parsed as well.
+    """
+    graph = into if into is not None else GraphIR()
+    by_id: Dict[str, NodeKey] = {}
+    for item in result.get("nodes") or []:
+        add_model_element(graph, "nodes", item, by_id)
+    for item in result.get("edges") or []:
+        add_model_element(graph, "edges", item, by_id)
+    if result.get("cypher"):
+        from graphdb.cypher_parser import parse_cypher_statements  # late import (cycle)
+        parse_cypher_statements(result["cypher"], into=graph)
+    return graph
+
+
+def add_model_element(graph: GraphIR, key: str, item: Any,
+                      by_id: Dict[str, NodeKey],
+                      waiting: Optional[Dict[str, List[dict]]] = None) -> None:
+    """Add one element of the model's ``nodes`` / ``edges`` / ``cypher``
+    array to *graph* (used when elements arrive one by one from a stream).
+    *by_id* maps response‑local node ids to keys and must be shared by all
+    elements of one response.
+
+    With *waiting*, an edge whose endpoint ids have not been seen yet is
+    parked there under a missing id and added as soon as that node arrives
+    (schema mode streams ``edges`` before ``nodes``); whatever is left at
+    the end of the response refers to nodes that never came."""
+    if key == "cypher":
+        if isinstance(item, str):
+            from graphdb.cypher_parser import parse_cypher_statements  # late import (cycle)
+            parse_cypher_statements([item], into=graph)
+    elif not isinstance(item, dict):
+        return
+    elif key == "nodes":
+        node = _json_node(item)
+        if node is None:
+            return
+        node_key = graph.add_node(node)
+        if item.get("id") is not None:
+            node_id = str(item["id"])
+            by_id[node_id] = node_key
+            for edge in (waiting.pop(node_id, ()) if waiting is not None else ()):
+                add_model_element(graph, "edges", edge, by_id, waiting)
+    elif key == "edges" and item.get("type"):
+        ids = (str(item.get("source", item.get("start"))), str(item.get("target", item.get("end"))))
+        start, end = by_id.get(ids[0]), by_id.get(ids[1])
+        if start is not None and end is not None:
+            graph.add_edge(Edge(start, item["type"], end, props=item.get("properties")))
+        elif waiting is not None:
+            waiting.setdefault(ids[0] if start is None else ids[1], []).append(item)
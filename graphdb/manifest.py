@@ -0,0 +1,146 @@
+# graphdb/manifest.py
+"""Persistent ingest manifest for incremental re‑ingestion.
+
+For every source document the manifest remembers its size, mtime, content
+hash, ingest timestamp and the IR keys of the nodes and edges it produced.
+An unchanged file is recognised from ``stat()`` alone (one primary‑key
+lookup, no read); a file whose stat changed is hashed, and only if the
+content differs is it re‑ingested.  The stored keys let the writer retract
+exactly the previous version's subgraph.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+from graphdb.graph_ir import Edge, GraphIR, Node, stable_id
+
+DEFAULT_PATH = Path(__file__).resolve().parents[1] / ".cache" / "ingest_manifest.sqlite"
+
+
+def source_id(path: str | Path) -> str:
+    """Canonical identifier of a document (absolute path)."""
+    return str(Path(path).resolve())
+
+
+def file_hash(path: str | Path, bufsize: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        while chunk := fh.read(bufsize):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _thaw(v):
+    return [_thaw(x) for x in v] if isinstance(v, (list, tuple)) else v
+
+
+def _node_from_json(data) -> Node:
+    labels, merge = data
+    return Node(labels, dict(merge))
+
+
+class Manifest:
+    """SQLite‑backed ``source → (stat, hash, produced keys)`` map."""
+
+    def __init__(self, path: str | Path = DEFAULT_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS documents (
+                   source       TEXT PRIMARY KEY,
+                   size         INTEGER NOT NULL,
+                   mtime_ns     INTEGER NOT NULL,
+                   content_hash TEXT NOT NULL,
+                   ingested_at  REAL NOT NULL,
+                   node_keys    TEXT NOT NULL,
+                   edge_keys    TEXT NOT NULL
+               )"""
+        )
+        self._db.commit()
+
+    # ── change detection ───────────────────────────────────────
+    def check(self, path: str | Path) -> Tuple[bool, Optional[str]]:
+        """Return ``(needs_ingest, content_hash)``.
+
+        The hash is only computed when size/mtime differ from the manifest;
+        if the content turns out identical the stored stat is refreshed and
+        the file is reported unchanged.
+        """
+        src = source_id(path)
+        st = os.stat(path)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT size, mtime_ns, content_hash FROM documents WHERE source = ?", (src,)
+            ).fetchone()
+        if row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return False, row[2]
+        digest = file_hash(path)
+        if row is not None and row[2] == digest:
+            with self._lock:
+                self._db.execute(
+                    "UPDATE documents SET size = ?, mtime_ns = ? WHERE source = ?",
+                    (st.st_size, st.st_mtime_ns, src),
+                )
+                self._db.commit()
+            return False, digest
+        return True, digest
+
+    # ── produced subgraph ──────────────────────────────────────
+    def previous_graph(self, path: str | Path) -> Optional[GraphIR]:
+        """IR holding only the keys written by the last ingest of *path*."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT node_keys, edge_keys FROM documents WHERE source = ?", (source_id(path),)
+            ).fetchone()
+        if row is None:
+            return None
+        graph = GraphIR()
+        for data in json.loads(row[0]):
+            graph.add_node(_node_from_json(data))
+        for start, rel_type, end, merge in json.loads(row[1]):
+            graph.add_edge(Edge(_node_from_json(start).key, rel_type, _node_from_json(end).key,
+                                dict(merge)))
+        return graph
+
+    def record(self, path: str | Path, content_hash: str, graph: GraphIR) -> None:
+        st = os.stat(path)
+        node_keys = json.dumps([_thaw(k) for k in graph.nodes], ensure_ascii=False)
+        edge_keys = json.dumps([_thaw(k) for k in graph.edges], ensure_ascii=False)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (source_id(path), st.st_size, st.st_mtime_ns, content_hash, time.time(),
+                 node_keys, edge_keys),
+            )
+            self._db.commit()
+
+    def produced_ids(self, path: str | Path) -> Tuple[list, list]:
+        """Stable node and edge IDs produced by the last ingest of *path*."""
+        graph = self.previous_graph(path)
+        if graph is None:
+            return [], []
+        return [stable_id(k) for k in graph.nodes], [stable_id(k) for k in graph.edges]
+
+    def close(self) -> None:
+        self._db.close()
+
+
+_manifest: Optional[Manifest] = None
+
+
+def get_manifest() -> Manifest:
+    global _manifest
+    if _manifest is None:
+        _manifest = Manifest(os.getenv("INGEST_MANIFEST_PATH", str(DEFAULT_PATH)))
+    return _manifest
@@ -0,0 +1,114 @@
+# graphdb/schema_provisioning.py
+"""Create the indexes (and optionally uniqueness constraints) that the
+batched MERGEs rely on, before any data is written.
+
+Key properties per label come from two places: the ``schema`` section of
+the model output (any of ``KEY_PROPERTIES`` declared for a label) and the
+merge keys actually used by the graph IR.  Only one property per label is
+indexed: the ``KEY_PROPERTIES`` member of the merge key, or else its first
+property.  That index already serves MERGEs on wider maps, and it keeps
+free‑form keys (long texts, arbitrary property combinations) from creating
+an unbounded number of composite indexes.  Every statement uses
+``IF NOT EXISTS`` and what is already in place is remembered per process,
+so steady‑state ingestion issues no schema queries at all.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from typing import Iterable, Optional, Set, Tuple
+
+from graphdb.graph_ir import KEY_PROPERTIES, GraphIR
+
+IndexSpec = Tuple[str, Tuple[str, ...]]  # (label, properties)
+
+_known: Set[IndexSpec] = set()
+_loaded = False
+_lock = threading.Lock()
+
+
+def _q(name: str) -> str:
+    return "`" + name.replace("`", "``") + "`"
+
+
+def _name(prefix: str, label: str, props: Tuple[str, ...]) -> str:
+    return re.sub(r"\W+", "_", f"{prefix}_{label}_{'_'.join(props)}").lower()
+
+
+def _schema_specs(schema: Optional[dict]) -> Iterable[IndexSpec]:
+    if not isinstance(schema, dict):
+        return
+    for item in schema.get("nodes") or []:
+        if not isinstance(item, dict) or not item.get("label"):
+            continue
+        props = item.get("properties") or {}
+        names = props.keys() if isinstance(props, dict) else [str(p) for p in props]
+        for key in KEY_PROPERTIES:
+            if key in names:
+                yield str(item["label"]), (key,)
+                break
+
+
+def required_indexes(graph: GraphIR, schema: Optional[dict] = None) -> Set[IndexSpec]:
+    """Derive ``(label, key properties)`` pairs for *graph* and *schema*."""
+    specs: Set[IndexSpec] = set(_schema_specs(schema))
+    for node in graph.nodes.values():
+        keys = [k for k, _ in node.merge]
+        if not keys:
+            continue
+        key = next((k for k in KEY_PROPERTIES if k in keys), keys[0])
+        for label in node.labels:
+            specs.add((label, (key,)))
+    return specs
+
+
+def _load_existing(session) -> None:
+    global _loaded
+    for rec in session.run(
+        "SHOW INDEXES YIELD entityType, labelsOrTypes, properties "
+        "WHERE entityType = 'NODE' RETURN labelsOrTypes, properties"
+    ):
+        for label in rec["labelsOrTypes"] or []:
+            _known.add((label, tuple(rec["properties"] or ())))
+    _loaded = True
+
+
+def ensure_indexes(driver, graph: GraphIR, schema: Optional[dict] = None,
+                   unique: bool = False, database: Optional[str] = None) -> int:
+    """Idempotently create missing indexes; return how many were issued.
+
+    With *unique* a single‑property key gets a uniqueness constraint (which
+    is backed by an index) instead of a plain range index.
+    """
+    from neo4j import exceptions  # the driver is loaded by now; keeps this module light
+
+    created = 0
+    with _lock:
+        missing = required_indexes(graph, schema) - _known
+        if not missing and _loaded:
+            return 0
+        with driver.session(database=database) as session:
+            if not _loaded:
+                _load_existing(session)
+                missing -= _known
+            for label, props in sorted(missing):
+                if unique and len(props) == 1:
+                    stmt = (
+                        f"CREATE CONSTRAINT {_q(_name('kg_uniq', label, props))} IF NOT EXISTS "
+                        f"FOR (n:{_q(label)}) REQUIRE n.{_q(props[0])} IS UNIQUE"
+                    )
+                else:
+                    on = ", ".join(f"n.{_q(p)}" for p in props)
+                    stmt = (
+                        f"CREATE INDEX {_q(_name('kg_idx', label, props))} IF NOT EXISTS "
+                        f"FOR (n:{_q(label)}) ON ({on})"
+                    )
+                try:
+                    session.run(stmt).consume()
+                    created += 1
+                except exceptions.Neo4jError as e:
+                    # e.g. existing duplicates prevent a uniqueness constraint
+                    print(f"⚠️ Could not create index for :{label}{list(props)} → {e.message}")
+                _known.add((label, props))
+    return created
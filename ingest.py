@@ -0,0 +1,270 @@
+# ingest.py
+"""Corpus ingestion: extract → Gemini → Neo4j for a directory or glob.
+
+The three stages run concurrently and are connected by bounded queues, so
+CPU‑bound extraction (process pool), network‑bound model calls (asyncio)
+and database writes (one writer thread) overlap and wall‑clock time
+approaches that of the slowest stage.  A full queue blocks the stage that
+feeds it, which keeps memory bounded on large corpora.
+
+    python ingest.py samples/
+    python ingest.py "docs/**/*.pdf" --extract-workers 8 --llm-concurrency 16
+    python ingest.py backfill/ --export import_csv/    # neo4j-admin CSVs
+
+Documents already in the ingest manifest with unchanged content are skipped
+up front, and a changed document replaces its previous subgraph (see
+``graphdb.manifest``); ``--full`` re‑ingests everything.  ``--export``
+always exports every document and records them all in the manifest.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import glob
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from preprocess.text_extractor import SUPPORTED_SUFFIXES, extract_text_from_file
+
+_DONE = object()  # end‑of‑stream marker passed down the queues
+
+
+class StageStats:
+    """Per‑stage document count, failures and busy time."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.docs = 0
+        self.failed = 0
+        self.busy_s = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, ok: bool = True) -> None:
+        with self._lock:
+            self.busy_s += seconds
+            if ok:
+                self.docs += 1
+            else:
+                self.failed += 1
+
+    def report(self, wall_s: float) -> str:
+        rate = self.docs / wall_s if wall_s else 0.0
+        return (f"{self.name:<8} {self.docs:>6} docs  {self.failed:>4} failed  "
+                f"busy {self.busy_s:8.1f}s  {rate:7.2f} docs/s")
+
+
+def collect_paths(target: str) -> List[Path]:
+    """A directory is searched recursively; anything else is a glob."""
+    p = Path(target)
+    if p.is_dir():
+        files = (f for f in p.rglob("*") if f.is_file())
+    else:
+        files = (Path(f) for f in glob.glob(target, recursive=True))
+    return sorted(f for f in files if f.suffix.lower() in SUPPORTED_SUFFIXES)
+
+
+# ──────────────────────────────────────────────────────────────
+# Stage 1 – extraction (process pool)
+# ──────────────────────────────────────────────────────────────
+
+def _extract(path: str):
+    """Runs in a worker process; OCR stays in‑process to avoid nested pools."""
+    t0 = time.perf_counter()
+    paragraphs = extract_text_from_file(path, ocr_workers=1)
+    return paragraphs, time.perf_counter() - t0
+
+
+def extract_stage(paths: Iterable[Path], out_q: queue.Queue, workers: int,
+                  stats: StageStats) -> None:
+    in_flight = deque()
+
+    def emit_oldest():
+        path, fut = in_flight.popleft()
+        try:
+            paragraphs, seconds = fut.result()
+            stats.record(seconds)
+            out_q.put((path, paragraphs))
+        except Exception as e:
+            stats.record(0.0, ok=False)
+            print(f"⚠️ Extraction failed for {path}: {e}")
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path in paths:
+                in_flight.append((path, pool.submit(_extract, str(path))))
+                if len(in_flight) >= 2 * workers:
+                    emit_oldest()
+            while in_flight:
+                emit_oldest()
+    finally:
+        out_q.put(_DONE)
+
+
+# ──────────────────────────────────────────────────────────────
+# Stage 2 – Gemini (asyncio, bounded concurrency)
+# ──────────────────────────────────────────────────────────────
+
+async def _llm_stage(in_q: queue.Queue, out_q: queue.Queue, concurrency: int,
+                     stats: StageStats) -> None:
+    from gemini.gemini_client import generate_structured_schema_and_cypher_chunked_async
+
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(concurrency)
+    tasks = set()
+
+    async def handle(path: Path, paragraphs: List[str]) -> None:
+        try:
+            t0 = time.perf_counter()
+            try:
+                result = await generate_structured_schema_and_cypher_chunked_async(paragraphs)
+            except Exception as e:
+                stats.record(time.perf_counter() - t0, ok=False)
+                print(f"⚠️ Gemini failed for {path}: {e}")
+                return
+            stats.record(time.perf_counter() - t0)
+            await loop.run_in_executor(None, out_q.put, (path, result))
+        finally:
+            slots.release()
+
+    try:
+        while True:
+            item = await loop.run_in_executor(None, in_q.get)
+            if item is _DONE:
+                break
+            await slots.acquire()
+            task = asyncio.create_task(handle(*item))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+    finally:
+        out_q.put(_DONE)
+
+
+def llm_stage(in_q: queue.Queue, out_q: queue.Queue, concurrency: int, stats: StageStats) -> None:
+    asyncio.run(_llm_stage(in_q, out_q, concurrency, stats))
+
+
+# ──────────────────────────────────────────────────────────────
+# Stage 3 – writer (single thread owning the Neo4j session / CSV files)
+# ──────────────────────────────────────────────────────────────
+
+def write_stage(in_q: queue.Queue, stats: StageStats, batch_size: int,
+                export_dir: Optional[str], hashes: Dict[Path, str]) -> None:
+    from graphdb.graph_ir import graph_from_model_output
+
+    exporter = None
+    if export_dir:
+        from graphdb.bulk_export import BulkExporter
+        from graphdb.manifest import get_manifest, source_id
+        exporter = BulkExporter(export_dir)
+    else:
+        from graphdb.graph_builder import replace_document_graph
+
+    try:
+        while True:
+            item = in_q.get()
+            if item is _DONE:
+                break
+            path, result = item
+            t0 = time.perf_counter()
+            try:
+                if exporter is not None:
+                    graph = graph_from_model_output(result)
+                    exporter.add_graph(graph, source=source_id(path))
+                    # the import loads what the manifest records, so later
+                    # incremental runs diff against the backfill
+                    get_manifest().record(path, hashes[path], graph)
+                else:
+                    replace_document_graph(path, result, hashes[path], batch_size=batch_size)
+                stats.record(time.perf_counter() - t0)
+            except Exception as e:
+                stats.record(time.perf_counter() - t0, ok=False)
+                print(f"⚠️ Write failed for {path}: {e}")
+    finally:
+        if exporter is not None:
+            print(f"[DEBUG] Import command → {exporter.close()}")
+        else:
+            from graphdb.connection import close_connection, get_connection
+            print(f"[DEBUG] Neo4j pool → {get_connection().metrics()}")
+            close_connection()
+
+
+# ──────────────────────────────────────────────────────────────
+# CLI
+# ──────────────────────────────────────────────────────────────
+
+def select_changed(paths: List[Path], full: bool) -> Dict[Path, str]:
+    """Map each document that needs (re)ingesting to its content hash."""
+    from graphdb.manifest import file_hash, get_manifest
+
+    if full:
+        return {p: file_hash(p) for p in paths}
+    manifest = get_manifest()
+    changed = {}
+    for p in paths:
+        needs, digest = manifest.check(p)
+        if needs:
+            changed[p] = digest
+    return changed
+
+
+def ingest(target: str, extract_workers: int, llm_concurrency: int, queue_size: int,
+           batch_size: int, export_dir: Optional[str] = None,
+           full: bool = False) -> List[StageStats]:
+    found = collect_paths(target)
+    # an export is a full load into an empty database: every document goes
+    hashes = select_changed(found, full or bool(export_dir))
+    paths = [p for p in found if p in hashes]
+    print(f"[DEBUG] {len(paths)} of {len(found)} documents to ingest from {target!r}")
+    extracted: queue.Queue = queue.Queue(maxsize=queue_size)
+    generated: queue.Queue = queue.Queue(maxsize=queue_size)
+    stats = [StageStats("extract"), StageStats("gemini"), StageStats("write")]
+
+    t0 = time.perf_counter()
+    threads = [
+        threading.Thread(target=extract_stage, args=(paths, extracted, extract_workers, stats[0]),
+                         name="extract"),
+        threading.Thread(target=llm_stage, args=(extracted, generated, llm_concurrency, stats[1]),
+                         name="gemini"),
+    ]
+    for t in threads:
+        t.start()
+    write_stage(generated, stats[2], batch_size, export_dir, hashes)
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+
+    print(f"\n=== Ingestion finished in {wall:.1f}s ===")
+    for s in stats:
+        print(s.report(wall))
+    return stats
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("target", help="directory (searched recursively) or glob pattern")
+    ap.add_argument("--extract-workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--llm-concurrency", type=int,
+                    default=int(os.getenv("GEMINI_MAX_CONCURRENCY", "8")))
+    ap.add_argument("--queue-size", type=int, default=16,
+                    help="max documents buffered between stages")
+    ap.add_argument("--batch-size", type=int, default=int(os.getenv("NEO4J_BATCH_SIZE", "1000")))
+    ap.add_argument("--export", metavar="DIR",
+                    help="write neo4j-admin import CSVs to DIR instead of Neo4j")
+    ap.add_argument("--full", action="store_true",
+                    help="ignore the ingest manifest and re-ingest every document")
+    args = ap.parse_args(argv)
+    ingest(args.target, args.extract_workers, args.llm_concurrency, args.queue_size,
+           args.batch_size, args.export, args.full)
+
+
+if __name__ == "__main__":
+    main()
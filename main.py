@@ -1,23 +1,22 @@
 # main.py
 from preprocess.text_extractor import extract_text_from_file
 from gemini.gemini_client import (
-    generate_structured_schema_and_cypher,
+    generate_structured_schema_and_cypher_chunked,
     generate_semantic_narrative
 )
-from graphdb.graph_builder import execute_cypher_queries
+from graphdb.graph_builder import write_model_output
 
 def main():
-    # 1. Extract raw document text
-    text = extract_text_from_file("samples/sample.pdf")
+    # 1. Extract raw document paragraphs
+    paragraphs = extract_text_from_file("samples/sample.pdf")
 
-    # 2. Generate structured hierarchy, schema, and Cypher
-    result = generate_structured_schema_and_cypher(text)
+    # 2. Generate structured hierarchy, schema, nodes and edges (chunked map-reduce)
+    result = generate_structured_schema_and_cypher_chunked(paragraphs)
     hierarchy = result["hierarchy"]
     schema = result["schema"]
-    cypher_statements = result["cypher"]
 
     # 3. Populate Neo4j
-    execute_cypher_queries("\n".join(cypher_statements))
+    write_model_output(result)
 
     # 4. Semantic interpretation narrative
     narrative = generate_semantic_narrative(hierarchy, schema)
@@ -0,0 +1,129 @@
+import math
+import os
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from common.tokens import estimate_tokens
+from preprocess.text_extractor import Block
+
+# Documents shorter than this are never stripped
+BOILERPLATE_MIN_PAGES = int(os.getenv("BOILERPLATE_MIN_PAGES", 3))
+# A block is boilerplate once it recurs on at least this share of the pages
+# (0.3 still catches headers that alternate between odd and even pages)
+BOILERPLATE_MIN_RATIO = float(os.getenv("BOILERPLATE_MIN_RATIO", 0.3))
+# Vertical tolerance (PDF points) when matching block positions across pages
+BOILERPLATE_Y_TOLERANCE = float(os.getenv("BOILERPLATE_Y_TOLERANCE", 12))
+
+_WS = re.compile(r"\s+")
+_DIGITS = re.compile(r"\d+")
+# Page-number shapes, the only blocks whose numbers are folded: "7", "- 7 -",
+# "Page 7", "7 of 12", "Page 7 / 12", "Pagina 7 di 12" (after lowercasing)
+_PAGE_NUMBER = re.compile(r"[-–—]?\s*(?:(?:page|pagina|pag\.?|p\.)\s*)?\d+"
+                          r"(?:\s*(?:of|di|/)\s*\d+)?\s*[-–—]?")
+
+
+class BoilerplateReport(NamedTuple):
+    """What stripping removed from one document."""
+    pages: int
+    blocks_removed: int
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+    def __str__(self) -> str:
+        share = self.tokens_saved / self.tokens_before if self.tokens_before else 0.0
+        return (f"removed {self.blocks_removed} boilerplate blocks over {self.pages} pages, "
+                f"~{self.tokens_saved} tokens saved ({share:.0%})")
+
+
+def normalize_block(text: str) -> str:
+    """Case and whitespace folded; numbers too in page numbers, so "Page 3 of 12"
+    matches "Page 4 of 12" while "Article 3" and "Article 4" stay distinct.
+
+    >>> normalize_block("Page  3 of 12"), normalize_block("Pagina 3 di 12")
+    ('page # of #', 'pagina # di #')
+    >>> normalize_block("Article 3"), normalize_block("Total due: EUR 30.00")
+    ('article 3', 'total due: eur 30.00')
+    """
+    text = _WS.sub(" ", text).strip().lower()
+    return _DIGITS.sub("#", text) if _PAGE_NUMBER.fullmatch(text) else text
+
+
+def _edges(block: Block) -> Optional[Tuple[float, float]]:
+    # top and bottom edge; OCR blocks carry no bbox
+    return None if block.bbox is None else (block.bbox[1], block.bbox[3])
+
+
+def _near(a: Optional[Tuple[float, float]], b: Optional[Tuple[float, float]],
+          tolerance: float) -> bool:
+    if a is None or b is None:
+        return a is b
+    return abs(a[0] - b[0]) <= tolerance and abs(a[1] - b[1]) <= tolerance
+
+
+def _clusters(blocks: List[Block], tolerance: float) -> Tuple[List[int], List[Set[int]]]:
+    """
+    Group blocks with the same normalized text whose top and bottom edges
+    lie within *tolerance* of the group's first (topmost) block. Returns the
+    cluster index of every block and the pages each cluster occurs on.
+    """
+    by_text: Dict[int, List[int]] = defaultdict(list)
+    for i, b in enumerate(blocks):
+        by_text[hash(normalize_block(b.text))].append(i)
+
+    cluster_of = [0] * len(blocks)
+    pages_of: List[Set[int]] = []
+    for members in by_text.values():
+        members.sort(key=lambda i: (blocks[i].bbox is not None, _edges(blocks[i]) or ()))
+        anchor: Any = ...
+        for i in members:
+            edges = _edges(blocks[i])
+            if anchor is ... or not _near(edges, anchor, tolerance):
+                anchor = edges
+                pages_of.append(set())
+            pages_of[-1].add(blocks[i].page)
+            cluster_of[i] = len(pages_of) - 1
+    return cluster_of, pages_of
+
+
+def remove_boilerplate(blocks: List[Block], min_pages: int = BOILERPLATE_MIN_PAGES,
+                       min_ratio: float = BOILERPLATE_MIN_RATIO,
+                       y_tolerance: float = BOILERPLATE_Y_TOLERANCE
+                       ) -> Tuple[List[Block], BoilerplateReport]:
+    """
+    Drop running headers, footers, page numbers and repeated disclaimers: a
+    block is boilerplate when the same normalized text sits at the same
+    vertical position (within *y_tolerance* points) on at least *min_ratio*
+    of the pages.
+
+    Numbered headings and amounts at a fixed position are kept; only the
+    page numbers go:
+
+    >>> blocks = [b for p in range(1, 11) for b in (
+    ...     Block(f"Article {p}", p, (72, 100, 300, 112)),
+    ...     Block(f"Total due: EUR {p * 10}.00", p, (72, 700, 300, 712)),
+    ...     Block(f"Page {p} of 10", p, (280, 800, 320, 812)))]
+    >>> kept, report = remove_boilerplate(blocks)
+    >>> [b.text for b in kept if b.page == 3], report.blocks_removed
+    (['Article 3', 'Total due: EUR 30.00'], 10)
+    """
+    keys, pages_of = _clusters(blocks, y_tolerance)
+
+    n_pages = len({b.page for b in blocks})
+    threshold = max(2, math.ceil(min_ratio * n_pages))
+    if n_pages >= min_pages:
+        kept = [b for b, key in zip(blocks, keys) if len(pages_of[key]) < threshold]
+    else:
+        kept = list(blocks)
+
+    report = BoilerplateReport(
+        pages=n_pages,
+        blocks_removed=len(blocks) - len(kept),
+        tokens_before=sum(estimate_tokens(b.text) for b in blocks),
+        tokens_after=sum(estimate_tokens(b.text) for b in kept),
+    )
+    return kept, report
@@ -0,0 +1,103 @@
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Iterator, List, Optional
+
+DOCUMENT_PART = "word/document.xml"
+
+# WordprocessingML namespaces (transitional and strict OOXML)
+_W_NS = {
+    "http://schemas.openxmlformats.org/wordprocessingml/2006/main",
+    "http://purl.oclc.org/ooxml/wordprocessingml/main",
+}
+# Alternate renderings of the same content (e.g. text boxes) live in
+# mc:Fallback next to mc:Choice; reading both would duplicate the text
+_MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+# Separator between the cells of a table row
+CELL_SEPARATOR = " | "
+
+
+def _local(tag: str) -> Optional[str]:
+    """Local name of a WordprocessingML tag, None for other namespaces."""
+    ns, _, name = tag[1:].partition("}")
+    return name if ns in _W_NS else None
+
+
+def iter_docx_paragraphs(filepath) -> Iterator[str]:
+    """
+    Stream the text of a DOCX body in reading order: one string per
+    non-empty paragraph and one per table row (cells joined by
+    CELL_SEPARATOR, nested tables folded into their cell).
+    word/document.xml is decompressed and parsed incrementally; every
+    finished top-level element and every finished table row is dropped from
+    the tree, so memory stays constant whatever the document or table size.
+    """
+    with zipfile.ZipFile(filepath) as zf, zf.open(DOCUMENT_PART) as xml:
+        body = None
+        paragraphs: List[List[str]] = []  # text runs of the open paragraphs (text boxes nest)
+        rows: List[List[str]] = []        # cell texts of the open table rows
+        cells: List[List[str]] = []       # paragraph texts of the open table cells
+        tables: List[ET.Element] = []     # open w:tbl elements, to drop finished rows from
+        runs = 0
+        fallback = 0
+
+        for event, elem in ET.iterparse(xml, events=("start", "end")):
+            if elem.tag == _MC_FALLBACK:
+                fallback += 1 if event == "start" else -1
+                continue
+            name = _local(elem.tag)
+            if fallback or name is None:
+                continue
+
+            if event == "start":
+                if name == "body":
+                    body = elem
+                elif name == "p":
+                    paragraphs.append([])
+                elif name == "r":
+                    runs += 1
+                elif name == "tr":
+                    rows.append([])
+                elif name == "tc":
+                    cells.append([])
+                elif name == "tbl":
+                    tables.append(elem)
+                continue
+
+            if name == "r":
+                runs -= 1
+            elif runs and paragraphs:
+                if name == "t":
+                    paragraphs[-1].append(elem.text or "")
+                elif name == "tab":
+                    paragraphs[-1].append("\t")
+                elif name in ("br", "cr"):
+                    paragraphs[-1].append("\n")
+            if name == "p" and paragraphs:
+                text = "".join(paragraphs.pop()).strip()
+                if text and cells:
+                    cells[-1].append(text)
+                elif text:
+                    yield text
+            elif name == "tc" and cells:
+                cell = " ".join(cells.pop())
+                if rows:
+                    rows[-1].append(cell)
+            elif name == "tr" and rows:
+                row = rows.pop()
+                text = CELL_SEPARATOR.join(row) if any(row) else ""
+                if text and cells:
+                    cells[-1].append(text)
+                elif text:
+                    yield text
+                elem.clear()
+                if tables:
+                    try:
+                        tables[-1].remove(elem)
+                    except ValueError:  # row wrapped in w:sdt/w:customXml: keep the empty shell
+                        pass
+            elif name == "tbl" and tables:
+                tables.pop()
+
+            # top-level element done: drop it (and everything before it)
+            if name in ("p", "tbl", "sdt") and body is not None and not (paragraphs or cells):
+                body.clear()
@@ -0,0 +1,121 @@
+import os
+from typing import Iterator, Tuple
+
+import numpy as np
+from PIL import Image, ImageOps
+
+# Resolution images are brought down to before OCR (Tesseract's sweet spot)
+IMAGE_TARGET_DPI = int(os.getenv("IMAGE_TARGET_DPI", 300))
+# "adaptive" (local mean, copes with uneven lighting), "otsu" (global) or "none"
+IMAGE_BINARIZE = os.getenv("IMAGE_BINARIZE", "adaptive")
+
+# Long side of an A4 page in inches, for images without a trustworthy DPI
+_PAGE_LONG_SIDE_IN = 11.7
+# Declared DPIs below this are placeholders (cameras and screenshots stamp
+# 72 or 96, some writers 1) rather than the real scan resolution
+_MIN_TRUSTED_DPI = 100
+
+
+def source_dpi(image: Image.Image) -> float:
+    """Declared DPI of a scan, or an estimate assuming the image is one page."""
+    dpi = image.info.get("dpi")
+    if dpi and float(dpi[0]) >= _MIN_TRUSTED_DPI:
+        return float(dpi[0])
+    return max(image.size) / _PAGE_LONG_SIDE_IN
+
+
+def downscale(image: Image.Image, target_dpi: int = IMAGE_TARGET_DPI) -> Image.Image:
+    """Shrink images above *target_dpi*; smaller ones are never upscaled."""
+    scale = target_dpi / source_dpi(image)
+    if scale >= 1:
+        return image
+    w, h = image.size
+    return image.resize((max(1, round(w * scale)), max(1, round(h * scale))),
+                        Image.Resampling.BOX, reducing_gap=2.0)
+
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    """Grey level maximising the between-class variance of the histogram."""
+    p = np.bincount(gray.ravel(), minlength=256) / gray.size
+    w0 = np.cumsum(p)
+    m0 = np.cumsum(p * np.arange(256))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (m0[-1] * w0 - m0) ** 2 / (w0 * (1.0 - w0))
+    return int(np.argmax(np.nan_to_num(between)))
+
+
+def adaptive_mask(gray: np.ndarray, window: int = 0, offset: float = 0.15) -> np.ndarray:
+    """
+    Bradley local-mean thresholding: a pixel is ink when it is *offset* darker
+    than the mean of the window around it. Window sums come from one
+    integral image, so the cost is independent of the window size.
+
+    The integral is uint32: it wraps on large images, but every window sum
+    fits, so the wrapped differences are exact. It is padded by the window
+    radius (zeros before, the last row/column repeated after), which turns
+    the clipped window corners into four shifted views.
+    """
+    h, w = gray.shape
+    r = (window or max(15, min(h, w) // 16)) // 2
+    d = 2 * r + 1
+    integral = np.zeros((h + d, w + d), dtype=np.uint32)
+    inner = integral[r + 1:r + 1 + h, r + 1:r + 1 + w]
+    np.cumsum(gray, axis=0, dtype=np.uint32, out=inner)
+    np.cumsum(inner, axis=1, out=inner)
+    integral[r + 1:r + 1 + h, r + 1 + w:] = integral[r + 1:r + 1 + h, r + w:r + w + 1]
+    integral[r + 1 + h:] = integral[r + h]
+    sums = integral[d:, d:] - integral[:h, d:]
+    sums -= integral[d:, :w]
+    sums += integral[:h, :w]
+    del integral, inner
+    y, x = np.arange(h), np.arange(w)
+    rows = (np.minimum(y + r + 1, h) - np.maximum(y - r, 0)).astype(np.float32)
+    cols = (np.minimum(x + r + 1, w) - np.maximum(x - r, 0)).astype(np.float32)
+    threshold = sums.astype(np.float32)
+    del sums
+    threshold /= rows[:, None]
+    threshold /= cols[None, :]
+    threshold *= 1 - offset
+    return gray > threshold
+
+
+def binarize(image: Image.Image, method: str = IMAGE_BINARIZE) -> Image.Image:
+    """Black text on white background as an 8-bit image."""
+    if method == "none":
+        return image
+    gray = np.asarray(image.convert("L"))
+    if method == "otsu":
+        white = gray > otsu_threshold(gray)
+    elif method == "adaptive":
+        white = adaptive_mask(gray)
+    else:
+        raise ValueError(f"Unknown binarization method: {method}")
+    return Image.fromarray(np.where(white, 255, 0).astype(np.uint8), "L")
+
+
+def prepare_image(image: Image.Image, target_dpi: int = IMAGE_TARGET_DPI,
+                  method: str = IMAGE_BINARIZE) -> Image.Image:
+    """
+    Upright, grayscale, downscaled and binarized copy of a photo or scan.
+    Grayscale conversion comes first so resampling and thresholding touch one
+    channel instead of three.
+    """
+    image = ImageOps.exif_transpose(image).convert("L")
+    return binarize(downscale(image, target_dpi), method)
+
+
+def iter_image_frames(filepath) -> Iterator[Tuple[int, Image.Image]]:
+    """
+    Yield the prepared frames of an image file with 1-based frame numbers.
+    Multi-page TIFFs are decoded one frame at a time, so only the current
+    page is in memory. A frame that fails to decode is logged and skipped.
+    """
+    with Image.open(filepath) as img:
+        for i in range(getattr(img, "n_frames", 1)):
+            try:
+                img.seek(i)
+                frame = prepare_image(img)
+            except Exception as e:
+                print(f"⚠️ Decoding failed for {filepath} page {i + 1}: {type(e).__name__}: {e}")
+                continue
+            yield i + 1, frame
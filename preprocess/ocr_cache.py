@@ -0,0 +1,62 @@
+# preprocess/ocr_cache.py
+"""Persistent cache of OCR results keyed by the rendered page.
+
+Entries are keyed by a hash of the page's raster (mode, size, pixel bytes)
+plus the OCR backend, language and page segmentation mode, and stored in a
+small SQLite file; re‑running a failed or repeated job skips OCR for every
+page already seen.  Excess entries are evicted least‑recently‑used first.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image
+
+from common.lru_store import LRUStore
+
+DEFAULT_PATH = Path(__file__).resolve().parents[1] / ".cache" / "ocr_cache.sqlite"
+
+
+def page_key(image: Image.Image, config: str) -> str:
+    """
+    Hash of the rendered pixels (mode, size and raw bytes) plus the OCR
+    language/config, so identical pages are recognised whatever file or page
+    number they come from.
+    """
+    h = hashlib.blake2b(digest_size=32)
+    h.update(f"{image.mode}|{image.size}|{config}\x00".encode("utf-8"))
+    h.update(image.tobytes())
+    return h.hexdigest()
+
+
+class OcrCache(LRUStore):
+    """Page-hash -> text cache in its own table, with no age limit."""
+    table = "ocr_pages"
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes: int = 256 * 1024 * 1024):
+        super().__init__(path, max_bytes=max_bytes, max_age_s=None)
+
+
+_cache: Optional[OcrCache] = None
+_cache_pid: Optional[int] = None
+
+
+def get_ocr_cache() -> Optional[OcrCache]:
+    """
+    This process's cache, or None if disabled via OCR_CACHE=0. A connection
+    inherited through fork() is never reused: each worker opens its own.
+    """
+    global _cache, _cache_pid
+    if os.getenv("OCR_CACHE", "1") == "0":
+        return None
+    if _cache is None or _cache_pid != os.getpid():
+        _cache = OcrCache(
+            os.getenv("OCR_CACHE_PATH", str(DEFAULT_PATH)),
+            max_bytes=int(float(os.getenv("OCR_CACHE_MAX_MB", "256")) * 1024 * 1024),
+        )
+        _cache_pid = os.getpid()
+    return _cache
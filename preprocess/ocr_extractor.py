@@ -1,12 +1,111 @@
-import pytesseract
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Optional
+
 from PIL import Image
 
-def ocr_from_image(image_path_or_obj):
+from preprocess.ocr_cache import get_ocr_cache, page_key
+
+# "auto" prefers a persistent tesserocr engine and falls back to pytesseract
+OCR_BACKEND = os.getenv("OCR_BACKEND", "auto")
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+# Tesseract page segmentation mode (3 = fully automatic, Tesseract's default)
+OCR_PSM = int(os.getenv("OCR_PSM", 3))
+
+
+class OcrBackend(ABC):
+    """Turns a PIL image into text."""
+    name = "base"
+
+    def __init__(self, lang: str = OCR_LANG, psm: int = OCR_PSM):
+        self.lang = lang
+        self.psm = psm
+
+    @property
+    def config_key(self) -> str:
+        """Everything besides the pixels that can change the recognised text."""
+        return f"{self.name}|{self.lang}|psm{self.psm}"
+
+    @abstractmethod
+    def image_to_string(self, image: Image.Image) -> str:
+        ...
+
+
+class TesserocrBackend(OcrBackend):
+    """
+    One Tesseract engine per process through the C API (tesserocr): the
+    language data is loaded once and images are handed over in memory.
+    """
+    name = "tesserocr"
+
+    def __init__(self, lang: str = OCR_LANG, psm: int = OCR_PSM):
+        super().__init__(lang, psm)
+        import tesserocr
+        self._api = tesserocr.PyTessBaseAPI(lang=lang, psm=psm)
+        self._lock = threading.Lock()  # an engine serves one image at a time
+
+    def image_to_string(self, image: Image.Image) -> str:
+        with self._lock:
+            self._api.SetImage(image)
+            return self._api.GetUTF8Text()
+
+
+class PytesseractBackend(OcrBackend):
+    """Fallback: one `tesseract` process (and temp file) per image."""
+    name = "pytesseract"
+
+    def __init__(self, lang: str = OCR_LANG, psm: int = OCR_PSM):
+        super().__init__(lang, psm)
+        import pytesseract
+        self._pytesseract = pytesseract
+
+    def image_to_string(self, image: Image.Image) -> str:
+        return self._pytesseract.image_to_string(image, lang=self.lang, config=f"--psm {self.psm}")
+
+
+_BACKENDS = {b.name: b for b in (TesserocrBackend, PytesseractBackend)}
+_backend: Optional[OcrBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> OcrBackend:
+    """
+    The OCR engine of this process, created on first use and reused for every
+    later page (each pool worker gets its own).
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                names = ["tesserocr", "pytesseract"] if OCR_BACKEND == "auto" else [OCR_BACKEND]
+                for name in names:
+                    try:
+                        _backend = _BACKENDS[name]()
+                        break
+                    except Exception as e:  # missing module or engine init failure
+                        if name == names[-1]:
+                            raise
+                        print(f"[DEBUG] OCR backend {name} unavailable ({e}), trying next")
+    return _backend
+
+
+def ocr_from_image(image_path_or_obj, use_cache: bool = True):
     """
-    Extract text from an image via OCR.
+    Extract text from an image via OCR, reusing the cached text of an
+    identical page rendered with the same OCR settings.
     """
     if isinstance(image_path_or_obj, str):
         image = Image.open(image_path_or_obj)
     else:
         image = image_path_or_obj
-    return pytesseract.image_to_string(image)
\ No newline at end of file
+    backend = get_backend()
+    cache = get_ocr_cache() if use_cache else None
+    if cache is None:
+        return backend.image_to_string(image)
+    key = page_key(image, backend.config_key)
+    text = cache.get(key)
+    if text is None:
+        text = backend.image_to_string(image)
+        cache.put(key, text)
+    return text
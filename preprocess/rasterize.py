@@ -0,0 +1,48 @@
+import mmap
+import tempfile
+from typing import Iterable, Iterator, Optional, Tuple
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+# DPI / colour presets for OCR rasterization
+RASTER_PRESETS = {
+    "fast":    {"dpi": 150, "grayscale": True},
+    "default": {"dpi": 300, "grayscale": True},
+    "color":   {"dpi": 300, "grayscale": False},
+}
+
+
+def _spilled_image(pix, mode: str, spill_dir: Optional[str]) -> Image.Image:
+    """Write the pixmap samples to an unlinked temp file and map them back
+    read-only, so the pixels live in the page cache instead of the heap."""
+    with tempfile.TemporaryFile(dir=spill_dir) as f:
+        f.write(pix.samples_mv)
+        f.flush()
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    # the mapping outlives the file descriptor and is released with the image
+    return Image.frombuffer(mode, (pix.width, pix.height), mm, "raw", mode, pix.stride, 1)
+
+
+def iter_page_images(filepath, page_nos: Iterable[int], preset: str = "default",
+                     spill: bool = False, spill_dir: Optional[str] = None
+                     ) -> Iterator[Tuple[int, Image.Image]]:
+    """
+    Rasterize the given 1-based pages one at a time with PyMuPDF pixmaps.
+    Only one page image is alive at any moment; with *spill* the pixels are
+    kept in a memory-mapped temp file rather than in RAM.
+    """
+    cfg = RASTER_PRESETS[preset]
+    colorspace = fitz.csGRAY if cfg["grayscale"] else fitz.csRGB
+    mode = "L" if cfg["grayscale"] else "RGB"
+    with fitz.open(filepath) as doc:
+        for page_no in page_nos:
+            pix = doc.load_page(page_no - 1).get_pixmap(
+                dpi=cfg["dpi"], colorspace=colorspace, alpha=False
+            )
+            if spill:
+                img = _spilled_image(pix, mode, spill_dir)
+            else:
+                img = Image.frombytes(mode, (pix.width, pix.height), pix.samples, "raw", mode, pix.stride, 1)
+            pix = None
+            yield page_no, img
@@ -1,33 +1,198 @@
-import fitz  # PyMuPDF
-import docx
-import mimetypes
-from pdf2image import convert_from_path
-from preprocess.ocr_extractor import ocr_from_image
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterator, List, NamedTuple, Optional, Tuple
 
-def extract_text_from_file(filepath):
+# Format libraries (PyMuPDF, the OCR stack) are imported inside
+# the functions that need them, so importing this module -- e.g. when a
+# worker process is spawned -- stays cheap.
+
+# Number of OCR worker processes (0/1 = OCR in the calling process)
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", os.cpu_count() or 1))
+# Scanned pages handed to a worker at once
+OCR_PAGE_WINDOW = int(os.getenv("OCR_PAGE_WINDOW", 4))
+# Rasterization preset (see preprocess.rasterize.RASTER_PRESETS)
+OCR_RASTER_PRESET = os.getenv("OCR_RASTER_PRESET", "default")
+# Keep rendered pages in memory-mapped temp files instead of RAM
+OCR_SPILL_TO_DISK = os.getenv("OCR_SPILL_TO_DISK", "0") == "1"
+# Drop running headers/footers and repeated disclaimers before prompting
+STRIP_BOILERPLATE = os.getenv("STRIP_BOILERPLATE", "1") == "1"
+
+# Format dispatch is by file suffix: mimetypes only knows .docx when the
+# system provides /etc/mime.types
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".tif", ".tiff"}
+SUPPORTED_SUFFIXES = {".pdf", ".docx"} | IMAGE_SUFFIXES
+
+
+class Block(NamedTuple):
+    """One paragraph of extracted text with its source page (1-based)."""
+    text: str
+    page: int
+    bbox: Optional[Tuple[float, float, float, float]] = None
+
+
+def _page_blocks(page, page_no: int) -> List[Block]:
+    blocks = []
+    for b in page.get_text("blocks"):
+        t = b[4].strip()
+        if t:
+            blocks.append(Block(t, page_no, tuple(b[:4])))
+    return blocks
+
+
+def ocr_pdf_pages(filepath: str, page_nos: Tuple[int, ...], preset: str = OCR_RASTER_PRESET,
+                  spill: bool = OCR_SPILL_TO_DISK) -> List[str]:
+    """Rasterize a window of PDF pages and OCR them one by one (runs inside a
+    worker process). A page whose OCR fails contributes no text."""
+    from preprocess.ocr_extractor import ocr_from_image
+    from preprocess.rasterize import iter_page_images
+
+    texts = []
+    for page_no, img in iter_page_images(filepath, page_nos, preset, spill):
+        try:
+            texts.append(ocr_from_image(img))
+        except Exception as e:
+            print(f"⚠️ OCR failed for {filepath} page {page_no}: {type(e).__name__}: {e}")
+            texts.append("")
+    return texts
+
+
+def _ocr_blocks(text: str, page_no: int) -> List[Block]:
+    text = text.strip()
+    return [Block(text, page_no)] if text else []
+
+
+class _WindowSlot:
+    """Placeholder for a scanned page until its OCR window has been submitted."""
+    __slots__ = ("future", "index")
+
+    def __init__(self, index: int):
+        self.future: Optional[Future] = None
+        self.index = index
+
+
+def iter_pdf_paragraphs(filepath, ocr_workers: Optional[int] = None) -> Iterator[Block]:
     """
-    Extract paragraphs from PDF/DOCX, fallback to OCR if needed.
-    Returns list of paragraph strings.
+    Yield blocks for every page in order, OCR-ing only the pages that have no
+    text layer. Scanned pages are grouped into windows of OCR_PAGE_WINDOW and
+    dispatched to a process pool; only a few windows per worker are in flight
+    so memory stays bounded regardless of document length.
     """
-    mime = mimetypes.guess_type(filepath)[0]
-    if mime == 'application/pdf':
-        doc = fitz.open(filepath)
-        text = " ".join([page.get_text() for page in doc])
-        if not text.strip():
-            images = convert_from_path(filepath)
-            text = " ".join([ocr_from_image(img) for img in images])
+    filepath = str(filepath)
+    workers = OCR_WORKERS if ocr_workers is None else ocr_workers
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    max_pending = max(2 * workers, 1) * OCR_PAGE_WINDOW
+    pending: deque = deque()  # (page_no, list[Block] | _WindowSlot) in page order
+    window: List[Tuple[int, _WindowSlot]] = []
+
+    def flush() -> None:
+        if not window:
+            return
+        pages = tuple(page_no for page_no, _ in window)
+        if pool is None:
+            fut: Future = Future()
+            fut.set_result(ocr_pdf_pages(filepath, pages))
+        else:
+            fut = pool.submit(ocr_pdf_pages, filepath, pages)
+        for _, slot in window:
+            slot.future = fut
+        window.clear()
+
+    def drain(limit: int) -> Iterator[Block]:
+        while pending:
+            page_no, item = pending[0]
+            if isinstance(item, _WindowSlot):
+                if len(pending) <= limit and (item.future is None or not item.future.done()):
+                    break
+                if item.future is None:
+                    flush()
+                try:
+                    text = item.future.result()[item.index]
+                except Exception as e:  # rasterization failed or the worker died
+                    print(f"⚠️ OCR failed for {filepath} page {page_no}: {type(e).__name__}: {e}")
+                    text = ""
+                item = _ocr_blocks(text, page_no)
+            pending.popleft()
+            yield from item
+
+    import fitz  # PyMuPDF
+
+    try:
+        with fitz.open(filepath) as doc:
+            for page_no in range(1, doc.page_count + 1):
+                blocks = _page_blocks(doc.load_page(page_no - 1), page_no)
+                if blocks:
+                    pending.append((page_no, blocks))
+                else:
+                    slot = _WindowSlot(len(window))
+                    window.append((page_no, slot))
+                    pending.append((page_no, slot))
+                    if len(window) >= OCR_PAGE_WINDOW:
+                        flush()
+                yield from drain(max_pending)
+        yield from drain(0)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_image_paragraphs(filepath) -> Iterator[Block]:
+    """
+    OCR a PNG/JPEG/TIFF file, one block per frame (page) of a multi-page TIFF.
+    A frame whose decoding or OCR fails contributes no text.
+    """
+    from preprocess.image_preprocess import iter_image_frames
+    from preprocess.ocr_extractor import ocr_from_image
+
+    for frame_no, img in iter_image_frames(filepath):
+        try:
+            text = ocr_from_image(img)
+        except Exception as e:
+            print(f"⚠️ OCR failed for {filepath} page {frame_no}: {type(e).__name__}: {e}")
+            continue
+        yield from _ocr_blocks(text, frame_no)
+
+
+def iter_paragraphs(filepath, ocr_workers: Optional[int] = None) -> Iterator[Block]:
+    """
+    Yield paragraph blocks from PDF/DOCX/image files, OCR-ing scanned PDF
+    pages and images.
+    """
+    suffix = os.path.splitext(str(filepath))[1].lower()
+    if suffix == ".pdf":
+        yield from iter_pdf_paragraphs(filepath, ocr_workers)
+    elif suffix in IMAGE_SUFFIXES:
+        yield from iter_image_paragraphs(filepath)
+    elif suffix == ".docx":
+        from preprocess.docx_reader import iter_docx_paragraphs
+
+        for t in iter_docx_paragraphs(filepath):
+            yield Block(t, 1)
     else:
-        return extract_paragraphs_from_docx(filepath)
+        raise ValueError(f"Unsupported file type {suffix or '(no suffix)'}: {filepath}")
+
 
-    paragraphs = []
-    for page in doc:
-        blocks = page.get_text("blocks")
-        for b in blocks:
-            t = b[4].strip()
-            if t:
-                paragraphs.append(t)
-    return paragraphs
+def extract_text_from_file(filepath, ocr_workers: Optional[int] = None,
+                           strip_boilerplate: bool = STRIP_BOILERPLATE):
+    """
+    Extract paragraphs from PDF/DOCX/image files, fallback to OCR if needed.
+    Blocks repeated across pages (headers, footers, page numbers) are dropped
+    unless *strip_boilerplate* is off.
+    Returns list of paragraph strings.
+    """
+    blocks = list(iter_paragraphs(filepath, ocr_workers))
+    if strip_boilerplate:
+        from preprocess.boilerplate import remove_boilerplate
+
+        blocks, report = remove_boilerplate(blocks)
+        if report.blocks_removed:
+            print(f"[DEBUG] {filepath}: {report}")
+    return [b.text for b in blocks]
 
 def extract_paragraphs_from_docx(filepath):
-    doc = docx.Document(filepath)
-    return [p.text.strip() for p in doc.paragraphs if p.text.strip()]
+    """
+    Paragraph and table-row texts of a DOCX body (see iter_docx_paragraphs).
+    """
+    from preprocess.docx_reader import iter_docx_paragraphs
+
+    return list(iter_docx_paragraphs(filepath))